@@ -0,0 +1 @@
+"""Helpers shared by the CS111 extraction and grading scripts."""
@@ -0,0 +1,143 @@
+"""Non-interactive batch grading across a pool of worker processes."""
+import os
+import sys
+import queue
+import tempfile
+import collections
+import threading
+import contextlib
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Grader instance owned by each worker process, built once by _init_worker
+_grader = None
+
+def _pool_context() -> multiprocessing.context.BaseContext:
+    """Start workers from a clean process rather than forking this one.
+
+    Pools start their workers lazily, possibly from a feeding thread while
+    other threads hold locks (such as stdout's); a forked worker would inherit
+    them held and hang.
+    """
+    return multiprocessing.get_context("forkserver" if "forkserver" in multiprocessing.get_all_start_methods()
+                                       else "spawn")
+
+def _init_worker(grader_factory: Callable[[], Any]) -> None:
+    global _grader
+    _grader = grader_factory()
+
+@contextlib.contextmanager
+def capture_output() -> Iterator[List[str]]:
+    """Redirect fds 1 and 2 to a scratch file and collect what was written.
+
+    Redirecting at the file-descriptor level also captures subprocesses such as
+    node or npm, which write straight to the inherited descriptors. The captured
+    text is appended to the yielded list when the block exits.
+    """
+    captured: List[str] = []
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_fds = (os.dup(1), os.dup(2))
+    with tempfile.TemporaryFile(mode="w+", encoding="utf-8", errors="replace") as sink:
+        os.dup2(sink.fileno(), 1)
+        os.dup2(sink.fileno(), 2)
+        try:
+            yield captured
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.dup2(saved_fds[0], 1)
+            os.dup2(saved_fds[1], 2)
+            os.close(saved_fds[0])
+            os.close(saved_fds[1])
+            sink.seek(0)
+            captured.append(sink.read())
+
+def _grade_captured(student: str, submission_path: str) -> Tuple[str, Dict[str, Any], str]:
+    with capture_output() as captured:
+        try:
+            result = _grader.grade_submission(submission_path)
+        except Exception as e:
+            result = {
+                "error": f"Grader crashed: {str(e)}",
+                "total": {
+                    "points": 0,
+                    "max_points": sum(item.max_points for item in _grader.rubric_items),
+                    "percentage": 0
+                }
+            }
+    return student, result, captured[0]
+
+def grade_in_batch(grader_factory: Callable[[], Any], submissions: Iterable[Tuple[str, str]],
+                   jobs: int) -> Iterator[Tuple[str, Dict[str, Any], str]]:
+    """Grade (student, submission_path) pairs on `jobs` worker processes.
+
+    Yields (student, result, output) tuples as submissions finish, where output
+    is everything the grader printed while grading that student. submissions
+    may be a lazy iterable, e.g. one fed by extraction: it is consumed on a
+    separate thread and each pair is handed to a worker as soon as it arrives.
+    """
+    finished: "queue.Queue" = queue.Queue()
+    feed_errors: List[BaseException] = []
+    with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=_pool_context(), initializer=_init_worker,
+                             initargs=(grader_factory,)) as pool:
+        def feed() -> None:
+            submitted = 0
+            try:
+                for student, path in submissions:
+                    pool.submit(_grade_captured, student, path).add_done_callback(finished.put)
+                    submitted += 1
+            except BaseException as e:
+                feed_errors.append(e)
+            finally:
+                # The submission count marks the end of the feed
+                finished.put(submitted)
+        
+        threading.Thread(target=feed, daemon=True).start()
+        expected = None
+        received = 0
+        while expected is None or received < expected:
+            item = finished.get()
+            if isinstance(item, int):
+                expected = item
+                continue
+            received += 1
+            yield item.result()
+    if feed_errors:
+        raise feed_errors[0]
+
+def grade_in_order(grader_factory: Callable[[], Any], submissions: Sequence[Tuple[str, str]],
+                   lookahead: int = 0) -> Iterator[Tuple[str, Dict[str, Any], Optional[str]]]:
+    """Grade (student, submission_path) pairs one at a time, in order, for interactive review.
+
+    With lookahead, the next `lookahead` submissions are graded on background
+    worker processes while the caller reviews the current one, and each
+    student's output is captured and yielded with the result. Without it,
+    each submission is graded in this process when it's requested and output
+    goes straight to the terminal (None is yielded instead). Closing the
+    iterator early cancels whatever hasn't started yet.
+    """
+    if lookahead <= 0:
+        grader = grader_factory()
+        for student, path in submissions:
+            yield student, grader.grade_submission(path), None
+        return
+
+    pool = ProcessPoolExecutor(max_workers=lookahead, mp_context=_pool_context(), initializer=_init_worker,
+                               initargs=(grader_factory,))
+    pending: "collections.deque" = collections.deque()
+    remaining = iter(submissions)
+    try:
+        while True:
+            # Keep the current submission plus `lookahead` more in flight
+            while len(pending) <= lookahead:
+                submission = next(remaining, None)
+                if submission is None:
+                    break
+                pending.append(pool.submit(_grade_captured, *submission))
+            if not pending:
+                return
+            yield pending.popleft().result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,850 @@
+// Headless behavior tests for the lab pages.
+//
+// Reads one JSON request on stdin: {tree, behaviors, students: [{id, source}],
+// timeout}. `tree` is the lab's HTML already parsed by dom_harness.py. Every
+// behavior of every student runs against a fresh copy of the page and the
+// student's script, inside its own vm context with a minimal DOM, fake timers
+// and a seeded Math.random. Writes one {id, results: [{name, passed, detail}]}
+// line per student to stdout.
+const vm = require('vm');
+
+const VOID_ELEMENTS = new Set(['area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'source', 'track', 'wbr']);
+const START_TIME = Date.UTC(2024, 0, 15, 9, 0, 0);
+const MAX_TIMER_RUNS = 100000;
+
+class HarnessError extends Error {}
+
+// ---------------------------------------------------------------- DOM shim
+
+function decodeEntities(text) {
+    return text.replace(/&(#x[0-9a-f]+|#\d+|amp|lt|gt|quot|apos|nbsp);/gi, (match, entity) => {
+        const lower = entity.toLowerCase();
+        if (lower[0] === '#') {
+            return String.fromCodePoint(lower[1] === 'x' ? parseInt(lower.slice(2), 16) : parseInt(lower.slice(1), 10));
+        }
+        return { amp: '&', lt: '<', gt: '>', quot: '"', apos: "'", nbsp: ' ' }[lower];
+    });
+}
+
+function escapeText(text) {
+    return text.replace(/&/g, '&amp;').replace(/</g, '&lt;').replace(/>/g, '&gt;');
+}
+
+class Node {
+    constructor(document) {
+        this.ownerDocument = document;
+        this.parentNode = null;
+        this.childNodes = [];
+    }
+
+    get parentElement() { return this.parentNode instanceof Element ? this.parentNode : null; }
+    get firstChild() { return this.childNodes[0] || null; }
+    get lastChild() { return this.childNodes[this.childNodes.length - 1] || null; }
+
+    get nextSibling() {
+        const siblings = this.parentNode ? this.parentNode.childNodes : [];
+        return siblings[siblings.indexOf(this) + 1] || null;
+    }
+
+    get previousSibling() {
+        const siblings = this.parentNode ? this.parentNode.childNodes : [];
+        return siblings[siblings.indexOf(this) - 1] || null;
+    }
+
+    appendChild(child) { return this.insertBefore(child, null); }
+
+    insertBefore(child, reference) {
+        if (child.parentNode) {
+            child.parentNode.removeChild(child);
+        }
+        const index = reference ? this.childNodes.indexOf(reference) : -1;
+        if (index < 0) {
+            this.childNodes.push(child);
+        } else {
+            this.childNodes.splice(index, 0, child);
+        }
+        child.parentNode = this;
+        return child;
+    }
+
+    removeChild(child) {
+        const index = this.childNodes.indexOf(child);
+        if (index < 0) {
+            throw new Error('The node to be removed is not a child of this node.');
+        }
+        this.childNodes.splice(index, 1);
+        child.parentNode = null;
+        return child;
+    }
+
+    replaceChild(newChild, oldChild) {
+        this.insertBefore(newChild, oldChild);
+        return this.removeChild(oldChild);
+    }
+
+    remove() {
+        if (this.parentNode) {
+            this.parentNode.removeChild(this);
+        }
+    }
+
+    contains(node) {
+        for (let current = node; current; current = current.parentNode) {
+            if (current === this) {
+                return true;
+            }
+        }
+        return false;
+    }
+}
+
+class Text extends Node {
+    constructor(document, data) {
+        super(document);
+        this.nodeType = 3;
+        this.nodeName = '#text';
+        this.data = String(data);
+    }
+
+    get textContent() { return this.data; }
+    set textContent(value) { this.data = String(value); }
+    get nodeValue() { return this.data; }
+    set nodeValue(value) { this.data = String(value); }
+}
+
+class ClassList {
+    constructor(element) { this.element = element; }
+    get values() { return (this.element.getAttribute('class') || '').split(/\s+/).filter(Boolean); }
+    set values(classes) { this.element.setAttribute('class', classes.join(' ')); }
+    get length() { return this.values.length; }
+    contains(name) { return this.values.includes(name); }
+    add(...names) { this.values = [...new Set([...this.values, ...names])]; }
+    remove(...names) { this.values = this.values.filter(name => !names.includes(name)); }
+
+    toggle(name, force) {
+        const present = this.contains(name);
+        const wanted = force === undefined ? !present : Boolean(force);
+        if (wanted !== present) {
+            wanted ? this.add(name) : this.remove(name);
+        }
+        return wanted;
+    }
+
+    replace(oldName, newName) {
+        if (!this.contains(oldName)) {
+            return false;
+        }
+        this.values = this.values.map(name => (name === oldName ? newName : name));
+        return true;
+    }
+
+    toString() { return this.values.join(' '); }
+}
+
+class Element extends Node {
+    constructor(document, tagName, attributes) {
+        super(document);
+        this.nodeType = 1;
+        this.localName = tagName.toLowerCase();
+        this.tagName = this.nodeName = tagName.toUpperCase();
+        this.attributes = Object.assign({}, attributes || {});
+        this.style = {};
+        this.listeners = {};
+        this.classList = new ClassList(this);
+        this.disabled = 'disabled' in this.attributes;
+        this.checked = 'checked' in this.attributes;
+        this._value = null;
+    }
+
+    get id() { return this.getAttribute('id') || ''; }
+    set id(value) { this.setAttribute('id', value); }
+    get className() { return this.getAttribute('class') || ''; }
+    set className(value) { this.setAttribute('class', value); }
+    get name() { return this.getAttribute('name') || ''; }
+    get type() { return this.getAttribute('type') || (this.localName === 'input' ? 'text' : ''); }
+    get placeholder() { return this.getAttribute('placeholder') || ''; }
+
+    get value() {
+        if (this._value !== null) {
+            return this._value;
+        }
+        if (this.localName === 'textarea') {
+            return this.textContent;
+        }
+        if (this.localName === 'select') {
+            const options = this.querySelectorAll('option');
+            const selected = options.find(option => 'selected' in option.attributes) || options[0];
+            return selected ? selected.value : '';
+        }
+        if (this.localName === 'option' && !('value' in this.attributes)) {
+            return this.textContent;
+        }
+        return this.getAttribute('value') || '';
+    }
+
+    set value(value) { this._value = value === null || value === undefined ? '' : String(value); }
+
+    get valueAsNumber() {
+        const value = this.value;
+        return value.trim() === '' ? NaN : Number(value);
+    }
+
+    get dataset() {
+        const data = {};
+        Object.keys(this.attributes).filter(name => name.startsWith('data-')).forEach(name => {
+            data[name.slice(5).replace(/-([a-z])/g, (match, letter) => letter.toUpperCase())] = this.attributes[name];
+        });
+        return data;
+    }
+
+    getAttribute(name) {
+        name = String(name).toLowerCase();
+        return name in this.attributes ? this.attributes[name] : null;
+    }
+
+    setAttribute(name, value) {
+        name = String(name).toLowerCase();
+        this.attributes[name] = String(value);
+        if (name === 'disabled') {
+            this.disabled = true;
+        }
+    }
+
+    removeAttribute(name) {
+        name = String(name).toLowerCase();
+        delete this.attributes[name];
+        if (name === 'disabled') {
+            this.disabled = false;
+        }
+    }
+
+    hasAttribute(name) { return String(name).toLowerCase() in this.attributes; }
+
+    get children() { return this.childNodes.filter(node => node instanceof Element); }
+    get childElementCount() { return this.children.length; }
+    get firstElementChild() { return this.children[0] || null; }
+    get lastElementChild() { return this.children[this.children.length - 1] || null; }
+
+    get nextElementSibling() {
+        for (let node = this.nextSibling; node; node = node.nextSibling) {
+            if (node instanceof Element) {
+                return node;
+            }
+        }
+        return null;
+    }
+
+    get previousElementSibling() {
+        for (let node = this.previousSibling; node; node = node.previousSibling) {
+            if (node instanceof Element) {
+                return node;
+            }
+        }
+        return null;
+    }
+
+    get textContent() { return this.childNodes.map(node => node.textContent).join(''); }
+
+    set textContent(value) {
+        this.childNodes.forEach(node => { node.parentNode = null; });
+        this.childNodes = [];
+        const text = value === null || value === undefined ? '' : String(value);
+        if (text) {
+            this.appendChild(new Text(this.ownerDocument, text));
+        }
+    }
+
+    get innerText() { return this.textContent; }
+    set innerText(value) { this.textContent = value; }
+
+    get innerHTML() { return this.childNodes.map(serialize).join(''); }
+
+    set innerHTML(html) {
+        this.textContent = '';
+        parseFragment(this.ownerDocument, String(html === null || html === undefined ? '' : html))
+            .forEach(node => this.appendChild(node));
+    }
+
+    get outerHTML() { return serialize(this); }
+
+    append(...nodes) {
+        nodes.forEach(node => this.appendChild(typeof node === 'string' ? new Text(this.ownerDocument, node) : node));
+    }
+
+    prepend(...nodes) {
+        const first = this.firstChild;
+        nodes.forEach(node => this.insertBefore(typeof node === 'string' ? new Text(this.ownerDocument, node) : node, first));
+    }
+
+    replaceChildren(...nodes) {
+        this.textContent = '';
+        this.append(...nodes);
+    }
+
+    insertAdjacentHTML(position, html) {
+        const nodes = parseFragment(this.ownerDocument, String(html));
+        const where = String(position).toLowerCase();
+        if (where === 'beforebegin' && this.parentNode) {
+            nodes.forEach(node => this.parentNode.insertBefore(node, this));
+        } else if (where === 'afterend' && this.parentNode) {
+            const next = this.nextSibling;
+            nodes.forEach(node => this.parentNode.insertBefore(node, next));
+        } else if (where === 'afterbegin') {
+            const first = this.firstChild;
+            nodes.forEach(node => this.insertBefore(node, first));
+        } else {
+            nodes.forEach(node => this.appendChild(node));
+        }
+    }
+
+    cloneNode(deep) {
+        const clone = new Element(this.ownerDocument, this.localName, this.attributes);
+        clone._value = this._value;
+        Object.assign(clone.style, this.style);
+        if (deep) {
+            this.childNodes.forEach(node => clone.appendChild(
+                node instanceof Element ? node.cloneNode(true) : new Text(this.ownerDocument, node.data)));
+        }
+        return clone;
+    }
+
+    descendants() {
+        const found = [];
+        const visit = node => node.children.forEach(child => { found.push(child); visit(child); });
+        visit(this);
+        return found;
+    }
+
+    querySelectorAll(selector) { return selectAll(this, selector); }
+    querySelector(selector) { return this.querySelectorAll(selector)[0] || null; }
+    getElementsByTagName(name) { return this.querySelectorAll(name); }
+    getElementsByClassName(name) { return this.descendants().filter(element => element.classList.contains(name)); }
+    matches(selector) { return parseSelector(selector).some(chain => matchesChain(this, chain)); }
+
+    closest(selector) {
+        for (let element = this; element instanceof Element; element = element.parentNode) {
+            if (element.matches(selector)) {
+                return element;
+            }
+        }
+        return null;
+    }
+
+    addEventListener(type, listener) {
+        (this.listeners[type] = this.listeners[type] || []).push(listener);
+    }
+
+    removeEventListener(type, listener) {
+        this.listeners[type] = (this.listeners[type] || []).filter(registered => registered !== listener);
+    }
+
+    dispatchEvent(event) { return dispatch(this, event); }
+    click() { if (!this.disabled) { dispatch(this, makeEvent('click')); } }
+    focus() { this.ownerDocument.activeElement = this; }
+    blur() { this.ownerDocument.activeElement = this.ownerDocument.body; }
+    select() {}
+    scrollIntoView() {}
+    getBoundingClientRect() { return { top: 0, left: 0, right: 0, bottom: 0, width: 0, height: 0, x: 0, y: 0 }; }
+}
+
+function serialize(node) {
+    if (node instanceof Text) {
+        return escapeText(node.data);
+    }
+    const attributes = Object.entries(node.attributes)
+        .map(([name, value]) => ` ${name}="${String(value).replace(/"/g, '&quot;')}"`).join('');
+    if (VOID_ELEMENTS.has(node.localName)) {
+        return `<${node.localName}${attributes}>`;
+    }
+    return `<${node.localName}${attributes}>${node.innerHTML}</${node.localName}>`;
+}
+
+// A small tolerant parser for the markup students assign to innerHTML
+function parseFragment(document, html) {
+    const root = new Element(document, 'template');
+    const open = [root];
+    const tokens = /<!--[\s\S]*?-->|<\/\s*([a-zA-Z][\w-]*)\s*>|<([a-zA-Z][\w-]*)((?:\s+[^\s"'>\/=]+(?:\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+))?)*)\s*\/?>|[^<]+|</g;
+    let match;
+    while ((match = tokens.exec(html)) !== null) {
+        const current = open[open.length - 1];
+        if (match[0].startsWith('<!--')) {
+            continue;
+        }
+        if (match[1]) {
+            const tag = match[1].toLowerCase();
+            const index = open.map(element => element.localName).lastIndexOf(tag);
+            if (index > 0) {
+                open.length = index;
+            }
+        } else if (match[2]) {
+            const attributes = {};
+            const attributePattern = /([^\s"'>\/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+)))?/g;
+            let attribute;
+            while ((attribute = attributePattern.exec(match[3] || '')) !== null) {
+                const value = attribute[2] !== undefined ? attribute[2] : attribute[3] !== undefined ? attribute[3] : attribute[4];
+                attributes[attribute[1].toLowerCase()] = decodeEntities(value === undefined ? '' : value);
+            }
+            const element = new Element(document, match[2], attributes);
+            current.appendChild(element);
+            if (!VOID_ELEMENTS.has(element.localName) && !match[0].endsWith('/>')) {
+                open.push(element);
+            }
+        } else {
+            current.appendChild(new Text(document, decodeEntities(match[0])));
+        }
+    }
+    const nodes = root.childNodes.slice();
+    nodes.forEach(node => { node.parentNode = null; });
+    return nodes;
+}
+
+// Selectors: compound selectors (tag, #id, .class, [attr], [attr=value]) joined by
+// descendant or child combinators, in comma-separated groups
+function parseSelector(selector) {
+    return String(selector).split(',').map(group => {
+        const chain = [];
+        let combinator = ' ';
+        group.trim().replace(/>/g, ' > ').split(/\s+/).filter(Boolean).forEach(part => {
+            if (part === '>') {
+                combinator = '>';
+                return;
+            }
+            const compound = { tag: null, ids: [], classes: [], attributes: [], combinator };
+            part.replace(/\[([^\]=]+)(?:=["']?([^\]"']*)["']?)?\]|([#.]?)([\w-]+|\*)/g, (match, attribute, value, prefix, name) => {
+                if (attribute) {
+                    compound.attributes.push([attribute.trim().toLowerCase(), value]);
+                } else if (prefix === '#') {
+                    compound.ids.push(name);
+                } else if (prefix === '.') {
+                    compound.classes.push(name);
+                } else if (name !== '*') {
+                    compound.tag = name.toLowerCase();
+                }
+                return '';
+            });
+            chain.push(compound);
+            combinator = ' ';
+        });
+        return chain;
+    });
+}
+
+function matchesCompound(element, compound) {
+    return (!compound.tag || element.localName === compound.tag) &&
+        compound.ids.every(id => element.id === id) &&
+        compound.classes.every(name => element.classList.contains(name)) &&
+        compound.attributes.every(([name, value]) =>
+            element.hasAttribute(name) && (value === undefined || element.getAttribute(name) === value));
+}
+
+function matchesChain(element, chain, index = chain.length - 1) {
+    if (!matchesCompound(element, chain[index])) {
+        return false;
+    }
+    if (index === 0) {
+        return true;
+    }
+    let ancestor = element.parentNode;
+    if (chain[index].combinator === '>') {
+        return ancestor instanceof Element && matchesChain(ancestor, chain, index - 1);
+    }
+    for (; ancestor instanceof Element; ancestor = ancestor.parentNode) {
+        if (matchesChain(ancestor, chain, index - 1)) {
+            return true;
+        }
+    }
+    return false;
+}
+
+function selectAll(root, selector) {
+    const chains = parseSelector(selector);
+    return root.descendants().filter(element => chains.some(chain => chain.length && matchesChain(element, chain)));
+}
+
+function makeEvent(type, properties) {
+    const event = Object.assign({
+        type, bubbles: true, defaultPrevented: false, target: null, currentTarget: null, _stopped: false,
+        preventDefault() { this.defaultPrevented = true; },
+        stopPropagation() { this._stopped = true; },
+        stopImmediatePropagation() { this._stopped = true; }
+    }, properties || {});
+    return event;
+}
+
+function dispatch(target, event) {
+    event.target = event.target || target;
+    const path = [];
+    for (let node = target; node; node = node.parentNode) {
+        path.push(node);
+    }
+    const document = target.ownerDocument || target;
+    if (document.defaultView) {
+        path.push(document.defaultView);
+    }
+    for (const node of event.bubbles === false ? [target] : path) {
+        event.currentTarget = node;
+        const property = node['on' + event.type];
+        if (typeof property === 'function') {
+            property.call(node, event);
+        } else if (node.attributes && typeof node.attributes['on' + event.type] === 'string') {
+            document.inlineHandler(node.attributes['on' + event.type]).call(node, event);
+        }
+        (node.listeners && node.listeners[event.type] || []).slice().forEach(listener => {
+            if (typeof listener === 'function') {
+                listener.call(node, event);
+            } else if (listener && typeof listener.handleEvent === 'function') {
+                listener.handleEvent(event);
+            }
+        });
+        if (event._stopped) {
+            break;
+        }
+    }
+    return !event.defaultPrevented;
+}
+
+class Document extends Element {
+    constructor() {
+        super(null, '#document');
+        this.ownerDocument = this;
+        this.nodeType = 9;
+        this.readyState = 'loading';
+        this.activeElement = null;
+        this.defaultView = null;
+        this.inlineHandler = null;
+    }
+
+    get documentElement() { return this.children[0] || null; }
+    get head() { return this.querySelector('head'); }
+    get body() { return this.querySelector('body'); }
+    get title() { const title = this.querySelector('title'); return title ? title.textContent : ''; }
+    createElement(tagName) { return new Element(this, String(tagName)); }
+    createTextNode(text) { return new Text(this, text); }
+    createDocumentFragment() { return new Element(this, '#document-fragment'); }
+    getElementById(id) { return this.descendants().find(element => element.id === String(id)) || null; }
+}
+
+function buildTree(document, parent, node) {
+    if (typeof node === 'string') {
+        parent.appendChild(new Text(document, node));
+        return;
+    }
+    const element = new Element(document, node.tag, node.attrs);
+    parent.appendChild(element);
+    node.children.forEach(child => buildTree(document, element, child));
+}
+
+// -------------------------------------------------------- page environment
+
+function mulberry32(seed) {
+    return () => {
+        seed = (seed + 0x6D2B79F5) | 0;
+        let t = Math.imul(seed ^ (seed >>> 15), 1 | seed);
+        t = (t + Math.imul(t ^ (t >>> 7), 61 | t)) ^ t;
+        return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+    };
+}
+
+class Page {
+    constructor(tree, source, timeout, seed) {
+        this.timeout = timeout;
+        this.clock = { now: START_TIME };
+        this.timers = new Map();
+        this.nextTimerId = 1;
+        this.alerts = [];
+        this.logs = [];
+        this.errors = [];
+        this.loadError = null;
+        this.trace = null;
+        this.storage = new Map();
+
+        const document = this.document = new Document();
+        buildTree(document, document, tree);
+        // Promise jobs queued by student code run at the end of each guarded call, inside its timeout
+        const context = this.context = vm.createContext({}, { microtaskMode: 'afterEvaluate' });
+        const window = this.window = vm.runInContext('globalThis', context);
+        document.defaultView = window;
+        document.activeElement = document.body;
+        window.listeners = {};
+
+        const write = (...args) => this.logs.push(args.map(String).join(' '));
+        const storage = this.storage;
+        Object.assign(context, {
+            document,
+            window,
+            self: window,
+            console: { log: write, info: write, warn: write, error: write, debug: write, table: write },
+            alert: message => { this.alerts.push(String(message)); },
+            confirm: message => { this.alerts.push(String(message)); return true; },
+            prompt: message => { this.alerts.push(String(message)); return null; },
+            setTimeout: (fn, delay, ...args) => this.addTimer(fn, delay, args, false),
+            setInterval: (fn, delay, ...args) => this.addTimer(fn, delay, args, true),
+            clearTimeout: id => this.timers.delete(id),
+            clearInterval: id => this.timers.delete(id),
+            requestAnimationFrame: fn => this.addTimer(() => fn(this.clock.now - START_TIME), 16, [], false),
+            cancelAnimationFrame: id => this.timers.delete(id),
+            localStorage: {
+                getItem: key => (storage.has(String(key)) ? storage.get(String(key)) : null),
+                setItem: (key, value) => storage.set(String(key), String(value)),
+                removeItem: key => storage.delete(String(key)),
+                clear: () => storage.clear()
+            },
+            addEventListener: (type, listener) => { (window.listeners[type] = window.listeners[type] || []).push(listener); },
+            removeEventListener: (type, listener) => {
+                window.listeners[type] = (window.listeners[type] || []).filter(registered => registered !== listener);
+            },
+            navigator: { userAgent: 'cs111-dom-harness' },
+            location: { href: 'http://localhost/', reload() {} },
+            __clock: this.clock,
+            __random: mulberry32(seed)
+        });
+        vm.runInContext(`(() => {
+            const RealDate = Date;
+            class FakeDate extends RealDate {
+                constructor(...args) { if (args.length) { super(...args); } else { super(__clock.now); } }
+                static now() { return __clock.now; }
+            }
+            globalThis.Date = FakeDate;
+            Math.random = __random;
+        })()`, context);
+        document.inlineHandler = code => vm.runInContext(`(function (event) {\n${code}\n})`, context);
+        this.callScript = new vm.Script('__harnessCall()');
+
+        try {
+            vm.runInContext(source, context, { filename: 'student.js', timeout });
+        } catch (e) {
+            this.loadError = `Script failed to load: ${describeError(e)}`;
+            return;
+        }
+        document.readyState = 'complete';
+        this.fire(document, 'DOMContentLoaded');
+        this.fire(document, 'load', window);
+    }
+
+    fire(document, type, target) {
+        this.guard(() => dispatch(target || document, makeEvent(type, { bubbles: false })));
+    }
+
+    // Run code that may call into the student's script, bounded by the vm timeout
+    guard(fn) {
+        this.context.__harnessCall = fn;
+        try {
+            return this.callScript.runInContext(this.context, { timeout: this.timeout });
+        } catch (e) {
+            if (e instanceof HarnessError) {
+                throw e;
+            }
+            this.errors.push(`Script error: ${describeError(e)}`);
+            return undefined;
+        }
+    }
+
+    addTimer(fn, delay, args, repeat) {
+        const id = this.nextTimerId++;
+        const interval = Math.max(0, Number(delay) || 0);
+        const callback = typeof fn === 'function' ? fn : this.document.inlineHandler(String(fn));
+        this.timers.set(id, { id, time: this.clock.now + interval, interval, callback, args, repeat });
+        return id;
+    }
+
+    advance(ms) {
+        const target = this.clock.now + ms;
+        for (let runs = 0; ; runs++) {
+            if (runs > MAX_TIMER_RUNS) {
+                throw new HarnessError('Too many timer callbacks; is a timer re-scheduling itself with no delay?');
+            }
+            let next = null;
+            this.timers.forEach(timer => {
+                if (timer.time <= target && (!next || timer.time < next.time || (timer.time === next.time && timer.id < next.id))) {
+                    next = timer;
+                }
+            });
+            if (!next) {
+                break;
+            }
+            this.clock.now = next.time;
+            if (next.repeat) {
+                next.time += Math.max(next.interval, 1);
+            } else {
+                this.timers.delete(next.id);
+            }
+            this.guard(() => next.callback.apply(this.window, next.args));
+        }
+        this.clock.now = target;
+    }
+
+    find(selector) {
+        const element = this.document.querySelector(selector);
+        if (!element) {
+            throw new HarnessError(`No element matches ${selector}`);
+        }
+        return element;
+    }
+
+    findByText(text) {
+        const element = this.document.descendants().find(candidate =>
+            (candidate.localName === 'button' || candidate.getAttribute('onclick') !== null) &&
+            candidate.textContent.trim() === text);
+        if (!element) {
+            throw new HarnessError(`No button labelled "${text}"`);
+        }
+        return element;
+    }
+
+    key(key) {
+        const target = this.document.activeElement || this.document.body;
+        ['keydown', 'keypress', 'keyup'].forEach(type =>
+            this.guard(() => dispatch(target, makeEvent(type, { key, code: key }))));
+    }
+}
+
+function describeError(e) {
+    return e && e.message ? e.message : String(e);
+}
+
+// ------------------------------------------------------------ behaviors
+
+function describe(value) {
+    return JSON.stringify(value);
+}
+
+function check(page, expectation) {
+    if ('alert_matches' in expectation) {
+        const pattern = new RegExp(expectation.alert_matches, 'i');
+        if (!page.alerts.some(message => pattern.test(message))) {
+            return `expected an alert matching /${expectation.alert_matches}/, got ${describe(page.alerts)}`;
+        }
+        return null;
+    }
+    if ('count' in expectation || 'min_count' in expectation) {
+        const count = page.document.querySelectorAll(expectation.selector).length;
+        if ('count' in expectation && count !== expectation.count) {
+            return `expected ${expectation.count} × ${expectation.selector}, found ${count}`;
+        }
+        if ('min_count' in expectation && count < expectation.min_count) {
+            return `expected at least ${expectation.min_count} × ${expectation.selector}, found ${count}`;
+        }
+        return null;
+    }
+    const element = page.find(expectation.selector);
+    const text = element.textContent.trim();
+    const value = element.value;
+    if ('text' in expectation && text !== expectation.text) {
+        return `${expectation.selector} shows ${describe(text)}, expected ${describe(expectation.text)}`;
+    }
+    if ('text_not' in expectation && (text === expectation.text_not || text === '')) {
+        return `${expectation.selector} still shows ${describe(text)}`;
+    }
+    if ('matches' in expectation && !new RegExp(expectation.matches, 'i').test(text)) {
+        return `${expectation.selector} shows ${describe(text)}, expected /${expectation.matches}/`;
+    }
+    if ('value' in expectation && value !== expectation.value) {
+        return `${expectation.selector} holds ${describe(value)}, expected ${describe(expectation.value)}`;
+    }
+    if ('value_matches' in expectation && !new RegExp(expectation.value_matches, 'i').test(value)) {
+        return `${expectation.selector} holds ${describe(value)}, expected /${expectation.value_matches}/`;
+    }
+    return null;
+}
+
+function runStep(page, step) {
+    if ('click' in step) {
+        const element = page.find(step.click);
+        page.guard(() => element.click());
+    } else if ('click_text' in step) {
+        const element = page.findByText(step.click_text);
+        page.guard(() => element.click());
+    } else if ('input' in step) {
+        const [selector, value] = step.input;
+        const element = page.find(selector);
+        element.value = value;
+        element.focus();
+        page.guard(() => dispatch(element, makeEvent('input')));
+        page.guard(() => dispatch(element, makeEvent('change')));
+    } else if ('key' in step) {
+        page.key(step.key);
+    } else if ('advance' in step) {
+        page.advance(step.advance);
+    } else if ('call' in step) {
+        page.guard(() => vm.runInContext(step.call, page.context));
+    } else if ('trace' in step) {
+        return trace(page, step.trace);
+    } else if ('expect' in step) {
+        return check(page, step.expect);
+    }
+    return null;
+}
+
+// Record an element's text now and after each of `ticks` steps of `every` ms of
+// fake time, then compare the recording with the expected trace
+function trace(page, options) {
+    const element = page.find(options.selector);
+    const recorded = [element.textContent.trim()];
+    for (let tick = 0; tick < options.ticks; tick++) {
+        page.advance(options.every);
+        recorded.push(element.textContent.trim());
+    }
+    page.trace = recorded;
+    const expected = options.expected || [];
+    for (let tick = 0; tick < Math.max(recorded.length, expected.length); tick++) {
+        if (recorded[tick] !== expected[tick]) {
+            return `at ${tick * options.every}ms ${options.selector} shows ${describe(recorded[tick])}, ` +
+                `expected ${describe(expected[tick])}`;
+        }
+    }
+    return null;
+}
+
+function withTrace(page, result) {
+    if (page.trace) {
+        result.trace = page.trace;
+    }
+    return result;
+}
+
+function runBehavior(tree, source, behavior, timeout, seed) {
+    let page;
+    try {
+        page = new Page(tree, source, timeout, seed);
+        if (page.loadError) {
+            return { name: behavior.name, passed: false, detail: page.loadError, loadError: true };
+        }
+        for (const step of behavior.steps) {
+            const failure = runStep(page, step);
+            if (failure) {
+                const errors = page.errors.length ? ` (${page.errors[0]})` : '';
+                return withTrace(page, { name: behavior.name, passed: false, detail: failure + errors });
+            }
+        }
+        return withTrace(page, { name: behavior.name, passed: true, detail: '' });
+    } catch (e) {
+        const errors = page && page.errors.length ? ` (${page.errors[0]})` : '';
+        return { name: behavior.name, passed: false, detail: describeError(e) + errors };
+    }
+}
+
+let input = '';
+process.stdin.setEncoding('utf-8');
+process.stdin.on('data', chunk => { input += chunk; });
+process.stdin.on('end', () => {
+    const request = JSON.parse(input);
+    // One line per student as soon as they are done, so a student that hangs the process costs only
+    // their own results
+    request.students.forEach(student => {
+        let loadError = null;
+        const results = request.behaviors.map((behavior, index) => {
+            // A script that doesn't load fails every behavior the same way; don't wait it out again
+            if (loadError) {
+                return { name: behavior.name, passed: false, detail: loadError };
+            }
+            const result = runBehavior(request.tree, student.source, behavior, request.timeout, index + 1);
+            if (result.loadError) {
+                loadError = result.detail;
+                delete result.loadError;
+            }
+            return result;
+        });
+        process.stdout.write(JSON.stringify({ id: student.id, results }) + '\n');
+    });
+});
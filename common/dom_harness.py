@@ -0,0 +1,199 @@
+"""Headless behavior tests for the labs' JavaScript.
+
+A behavior is a dict with a "name" and a list of "steps", each one of:
+
+    {"click": selector}            click the first element matching selector
+    {"click_text": label}          click the button whose text is label
+    {"input": [selector, value]}   type a value and fire input and change events
+    {"key": key}                   press a key on the focused element
+    {"advance": ms}                run the page's timers for ms of fake time
+    {"trace": {"selector", "every", "ticks", "expected"}}
+                                   record the element's text now and after each
+                                   of ticks steps of every ms of fake time; fail
+                                   unless the recording equals expected
+    {"call": code}                 evaluate code in the page
+    {"expect": check}              fail the behavior unless check holds
+
+where check has a "selector" and one of "text", "text_not", "matches"
+(a regex), "value", "value_matches", "count" or "min_count", or is
+{"alert_matches": regex}. Selectors support tags, #ids, .classes, [attrs]
+and descendant/child combinators.
+
+dom_harness.js runs every behavior for every student in a single node
+process, each against a fresh copy of the page in its own vm context. A
+student whose script hangs or crashes that process fails on their own; the
+process is restarted for the students after them.
+"""
+import os
+import json
+import queue
+import tempfile
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from common.toolchain import ToolchainError, get_toolchain
+
+HARNESS_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dom_harness.js")
+SCRIPT_TIMEOUT = 2  # seconds any one call into a student's script may run
+STUDENT_TIMEOUT = 30  # seconds for all of one student's behaviors
+
+class _TreeBuilder(HTMLParser):
+    VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                     "source", "track", "wbr"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.root = {"tag": "html", "attrs": {}, "children": []}
+        self.open_elements = [self.root]
+        self.in_script = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "html":
+            self.root["attrs"].update({name: value or "" for name, value in attrs})
+            return
+        if tag == "script":
+            # The student's script is run by the harness itself
+            self.in_script = True
+            return
+        element = {"tag": tag, "attrs": {name: value or "" for name, value in attrs}, "children": []}
+        self.open_elements[-1]["children"].append(element)
+        if tag not in self.VOID_ELEMENTS:
+            self.open_elements.append(element)
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        if tag not in self.VOID_ELEMENTS and tag not in ("html", "script"):
+            self.open_elements.pop()
+        self.in_script = False
+
+    def handle_endtag(self, tag):
+        if tag == "script":
+            self.in_script = False
+            return
+        for index in range(len(self.open_elements) - 1, 0, -1):
+            if self.open_elements[index]["tag"] == tag:
+                del self.open_elements[index:]
+                return
+
+    def handle_data(self, data):
+        if not self.in_script:
+            self.open_elements[-1]["children"].append(data)
+
+def html_tree(html_file: str) -> dict:
+    """Parse the lab's page into the element tree the harness builds its DOM from."""
+    with open(html_file, "r", encoding="utf-8") as f:
+        builder = _TreeBuilder()
+        builder.feed(f.read())
+        builder.close()
+    return builder.root
+
+def _harness_process(node: str, tree: dict, behaviors: Sequence[dict],
+                     students: List[dict]) -> Tuple[Dict[str, List[dict]], Optional[str]]:
+    """Run students through one harness process.
+
+    Returns the results of the students it finished, and why it stopped
+    before the rest (None if it didn't).
+    """
+    request = {"tree": tree, "behaviors": list(behaviors), "students": students, "timeout": SCRIPT_TIMEOUT * 1000}
+    with tempfile.TemporaryFile() as stderr:
+        try:
+            process = subprocess.Popen([node, HARNESS_SCRIPT], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                       stderr=stderr, text=True, encoding="utf-8")
+        except OSError as e:
+            raise ToolchainError(f"Could not run node: {str(e)}")
+        lines: "queue.Queue[Optional[str]]" = queue.Queue()
+
+        def read_lines():
+            for line in process.stdout:
+                lines.put(line)
+            lines.put(None)
+
+        threading.Thread(target=read_lines, daemon=True).start()
+        finished = {}
+        failure = None
+        try:
+            try:
+                process.stdin.write(json.dumps(request))
+                process.stdin.close()
+            except OSError:
+                pass  # the process died; reported below
+            for _ in students:
+                try:
+                    line = lines.get(timeout=STUDENT_TIMEOUT)
+                except queue.Empty:
+                    failure = f"Timed out after {STUDENT_TIMEOUT}s"
+                    break
+                if line is None:
+                    process.wait()
+                    stderr.seek(0)
+                    # node ends a crash report with its version; the error line itself comes before it
+                    errors = [text for text in stderr.read().decode("utf-8", errors="replace").splitlines()
+                              if "Error" in text]
+                    failure = f"Behavior tests crashed: {errors[-1].strip() if errors else f'exit code {process.returncode}'}"
+                    break
+                entry = json.loads(line)
+                finished[entry["id"]] = entry["results"]
+        finally:
+            process.kill()
+            process.wait()
+    return finished, failure
+
+def _run_harness(node: str, tree: dict, behaviors: Sequence[dict], students: List[dict]) -> Dict[str, List[dict]]:
+    """Run students through the harness, restarting it past any student that hangs or crashes it."""
+    results = {}
+    pending = students
+    while pending:
+        finished, failure = _harness_process(node, tree, behaviors, pending)
+        results.update(finished)
+        pending = [student for student in pending if student["id"] not in finished]
+        if pending:
+            # Students run in order, so the first unfinished one is the one that stopped the process
+            results[pending[0]["id"]] = [{"name": behavior["name"], "passed": False,
+                                          "detail": failure or "Behavior tests stopped early"}
+                                         for behavior in behaviors]
+            pending = pending[1:]
+    return results
+
+def run_behaviors(html_file: str, scripts: Dict[str, Optional[str]],
+                  behaviors: Sequence[dict], jobs: int = 1) -> Dict[str, List[dict]]:
+    """Run every behavior against each student's script on the lab's page.
+
+    scripts maps each student to their JS file, or None if they have none.
+    Returns, for each student, a list of {"name", "passed", "detail"} dicts in
+    the order of behaviors, with the recorded "trace" for behaviors that have
+    a trace step. With jobs > 1 the students are split between that many
+    node processes. Raises ToolchainError if node can't be run.
+    """
+    # Only node is needed; its cache sits next to the harness, not in the template that gets served
+    toolchain = get_toolchain(os.path.dirname(HARNESS_SCRIPT), packages=())
+    results = {}
+    students = []
+    for student, js_file in scripts.items():
+        if not js_file:
+            results[student] = [{"name": behavior["name"], "passed": False, "detail": "No JavaScript file found"}
+                                for behavior in behaviors]
+            continue
+        with open(js_file, "r", encoding="utf-8", errors="replace") as f:
+            students.append({"id": student, "source": f.read()})
+
+    if students:
+        tree = html_tree(html_file)
+        # Split the class between node processes; each one still runs its share sequentially
+        jobs = max(1, min(jobs, len(students)))
+        chunks = [students[index::jobs] for index in range(jobs)]
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            for chunk_results in pool.map(lambda chunk: _run_harness(toolchain.node, tree, behaviors, chunk), chunks):
+                results.update(chunk_results)
+    return {student: results[student] for student in scripts}
+
+def format_behavior_results(results: List[dict]) -> str:
+    """Render one student's behavior results for the grader."""
+    passed = sum(1 for result in results if result["passed"])
+    lines = [f"Behavior tests: {passed}/{len(results)} passed"]
+    for result in results:
+        mark = "✅" if result["passed"] else "❌"
+        lines.append(f"  {mark} {result['name']}" + (f": {result['detail']}" if result["detail"] else ""))
+    return "\n".join(lines)
@@ -0,0 +1,313 @@
+"""HTML validation with interchangeable backends and a content-hash result cache.
+
+Every backend reports messages in the validator.nu JSON format: dicts with
+"type" ("error" or "info"), optional "subType", "lastLine" and "message".
+"""
+import os
+import json
+import shutil
+import hashlib
+import subprocess
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Sequence
+from urllib.parse import unquote, urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from common.result_cache import ResultCache, hash_file
+
+REMOTE_VALIDATOR_URL = "https://validator.nu"
+# Path to a local vnu.jar (https://validator.github.io/validator/) when not given explicitly
+VNU_JAR_ENV = "VNU_JAR"
+VNU_TIMEOUT = 300  # seconds for one batch
+REMOTE_TIMEOUT = 30  # seconds per request
+REMOTE_CONCURRENCY = 4  # requests in flight at once
+REMOTE_RETRIES = 4
+# Statuses worth retrying: rate limiting and server-side failures
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# Bump when BasicValidator's checks change, so cached results are recomputed
+BASIC_VALIDATOR_VERSION = 3
+
+class ValidationError(Exception):
+    """Raised when a backend can't produce results for a batch."""
+
+@dataclass
+class Validation:
+    messages: List[Dict] = field(default_factory=list)
+    error: Optional[str] = None  # set instead of messages when validation failed
+
+class ValidatorBackend(ABC):
+    # Identifies the backend (and its version) in cache keys
+    name = ""
+
+    @abstractmethod
+    def validate_many(self, paths: Sequence[str]) -> Dict[str, Validation]:
+        """Validate several files at once; return a Validation for each path."""
+
+class RemoteValidator(ValidatorBackend):
+    """Posts documents to a validator.nu-compatible web service.
+
+    One keep-alive session is shared by up to `concurrency` requests at a time;
+    rate limiting and server errors are retried with exponential backoff,
+    honouring Retry-After.
+    """
+    def __init__(self, url: str = REMOTE_VALIDATOR_URL, concurrency: int = REMOTE_CONCURRENCY,
+                 timeout: float = REMOTE_TIMEOUT, retries: int = REMOTE_RETRIES):
+        self.url = url
+        self.name = f"remote:{url}"
+        self.concurrency = max(1, concurrency)
+        self.timeout = timeout
+        retry = Retry(
+            total=retries,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset({"POST"}),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(max_retries=retry, pool_connections=1, pool_maxsize=self.concurrency)
+        self.session = requests.Session()
+        self.session.headers['Content-Type'] = 'text/html; charset=utf-8'
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def validate_one(self, path: str) -> Validation:
+        with open(path, "rb") as f:
+            html_content = f.read()
+        try:
+            response = self.session.post(
+                self.url,
+                params={'out': 'json'},
+                data=html_content,
+                allow_redirects=False,
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            return Validation(error=f"Validator request failed: {str(e)}")
+        if response.status_code != 200:
+            return Validation(error=f"Validator error: {response.status_code}")
+        try:
+            return Validation(messages=response.json().get('messages', []))
+        except ValueError:
+            return Validation(error="Validator returned a response that isn't JSON")
+
+    def validate_many(self, paths: Sequence[str]) -> Dict[str, Validation]:
+        with ThreadPoolExecutor(max_workers=self.concurrency) as pool:
+            return dict(zip(paths, pool.map(self.validate_one, paths)))
+
+class VnuJarValidator(ValidatorBackend):
+    """Runs the Nu HTML Checker locally, validating a whole batch in one java process."""
+    def __init__(self, jar: str, java: Optional[str] = None):
+        self.jar = jar
+        self.java = java or shutil.which("java")
+        # Keyed by the jar's contents, so upgrading the checker invalidates cached results
+        self.name = f"vnu:{hash_file(jar)[:16]}"
+
+    @staticmethod
+    def find_jar(jar: Optional[str] = None) -> Optional[str]:
+        """The jar given, or the one named by $VNU_JAR, if it exists."""
+        jar = jar or os.environ.get(VNU_JAR_ENV)
+        return jar if jar and os.path.isfile(jar) and shutil.which("java") else None
+
+    def validate_many(self, paths: Sequence[str]) -> Dict[str, Validation]:
+        if not self.java:
+            raise ValidationError("Java is not installed or not on PATH.")
+        absolute_paths = {os.path.realpath(path): path for path in paths}
+        try:
+            completed = subprocess.run(
+                [self.java, "-jar", self.jar, "--format", "json", "--stdout", "--exit-zero-always",
+                 *absolute_paths],
+                capture_output=True, text=True, encoding="utf-8", timeout=VNU_TIMEOUT
+            )
+            report = json.loads(completed.stdout)
+        except subprocess.TimeoutExpired:
+            raise ValidationError("Timed out running vnu.jar")
+        except (OSError, ValueError) as e:
+            raise ValidationError(f"Could not run vnu.jar: {str(e)}")
+
+        # Messages are reported for the whole batch, each tagged with its document's file: URL
+        results = {path: Validation() for path in paths}
+        for message in report.get("messages", []):
+            url = message.pop("url", "")
+            path = absolute_paths.get(os.path.realpath(unquote(urlparse(url).path)))
+            if path is not None:
+                results[path].messages.append(message)
+        return results
+
+# Elements that never have an end tag
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta",
+                 "source", "track", "wbr"}
+# Elements whose end tag may be left out
+OPTIONAL_END_TAGS = {"html", "head", "body", "p", "li", "dt", "dd", "option", "optgroup",
+                     "tr", "td", "th", "thead", "tbody", "tfoot", "colgroup", "caption", "rt", "rp"}
+# Inline SVG and MathML, whose elements may be written self-closing
+FOREIGN_ELEMENTS = {"svg", "math"}
+OBSOLETE_ELEMENTS = {"acronym", "applet", "basefont", "big", "blink", "center", "dir", "font",
+                     "frame", "frameset", "marquee", "strike", "tt"}
+
+class _ConformanceParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.messages: List[Dict] = []
+        self.open_elements: List[str] = []
+        self.ids: Dict[str, int] = {}
+        self.seen_doctype = False
+        self.seen_start_tag = False
+        self.in_head = False
+        self.head_ended = False
+        self.seen_title = False
+
+    def report(self, message: str, message_type: str = "error") -> None:
+        entry = {"type": message_type, "lastLine": self.getpos()[0], "message": message}
+        if message_type == "warning":
+            entry.update(type="info", subType="warning")
+        self.messages.append(entry)
+
+    def handle_decl(self, decl):
+        if decl.lower().startswith("doctype"):
+            self.seen_doctype = True
+            if decl.lower().split() != ["doctype", "html"]:
+                self.report("Obsolete doctype. Expected “<!DOCTYPE html>”.")
+
+    def handle_starttag(self, tag, attrs):
+        self.check_start_tag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.open_elements.append(tag)
+
+    def handle_startendtag(self, tag, attrs):
+        self.check_start_tag(tag, attrs)
+        if tag in FOREIGN_ELEMENTS or FOREIGN_ELEMENTS.intersection(self.open_elements):
+            return
+        if tag not in VOID_ELEMENTS:
+            self.report("Self-closing syntax (“/>”) used on a non-void HTML element. "
+                        "Ignoring the slash and treating as a start tag.")
+            self.open_elements.append(tag)
+
+    def check_start_tag(self, tag, attrs):
+        if not self.seen_start_tag:
+            self.seen_start_tag = True
+            if not self.seen_doctype:
+                self.report("Start tag seen without seeing a doctype first. Expected “<!DOCTYPE html>”.")
+        attributes = dict(attrs)
+        if tag == "html" and not attributes.get("lang"):
+            self.report("Consider adding a “lang” attribute to the “html” start tag "
+                        "to declare the language of this document.", "warning")
+        elif tag == "head":
+            self.in_head = True
+        elif tag == "body" and self.in_head:
+            self.end_head()
+        elif tag == "title":
+            self.seen_title = True
+        elif tag == "img" and "alt" not in attributes:
+            self.report("An “img” element must have an “alt” attribute, except under certain conditions. "
+                        "For details, consult guidance on providing text alternatives for images.")
+        if tag in OBSOLETE_ELEMENTS:
+            self.report(f"The “{tag}” element is obsolete. Use CSS instead.")
+        element_id = attributes.get("id")
+        if element_id is not None:
+            if element_id in self.ids:
+                self.report(f"Duplicate ID “{element_id}”.")
+            else:
+                self.ids[element_id] = self.getpos()[0]
+
+    def end_head(self):
+        self.in_head = False
+        self.head_ended = True
+        if not self.seen_title:
+            self.report("Element “head” is missing a required instance of child element “title”.")
+
+    def handle_endtag(self, tag):
+        if tag == "head" and self.in_head:
+            self.end_head()
+        if tag not in self.open_elements:
+            self.report(f"Stray end tag “{tag}”.")
+            return
+        # Close everything opened since; only elements with optional end tags may be left open
+        unclosed = False
+        while True:
+            element = self.open_elements.pop()
+            if element == tag:
+                break
+            unclosed = unclosed or element not in OPTIONAL_END_TAGS
+        if unclosed:
+            self.report(f"End tag “{tag}” seen, but there were open elements.")
+
+    def close(self):
+        super().close()
+        # Also checks the title of a document without a <head> start tag
+        if not self.head_ended:
+            self.end_head()
+        unclosed = [element for element in self.open_elements if element not in OPTIONAL_END_TAGS]
+        if unclosed:
+            self.report(f"End of file reached with open elements: {', '.join(unclosed)}.")
+
+class BasicValidator(ValidatorBackend):
+    """A pure-Python subset of the HTML5 conformance checks, for use without java or a network.
+
+    Covers the mistakes students make most: a missing doctype, title or lang,
+    stray and unclosed tags, duplicate ids, images without alt text and
+    obsolete elements.
+    """
+    name = f"basic:{BASIC_VALIDATOR_VERSION}"
+
+    def validate_many(self, paths: Sequence[str]) -> Dict[str, Validation]:
+        results = {}
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                html_content = f.read()
+            parser = _ConformanceParser()
+            parser.feed(html_content)
+            parser.close()
+            results[path] = Validation(messages=parser.messages)
+        return results
+
+def validate_files(paths: Sequence[str], backend: ValidatorBackend,
+                   cache: Optional[ResultCache] = None) -> Dict[str, Validation]:
+    """Validate every file in one batch, reusing cached results for unchanged content.
+
+    Results are cached by the backend's name and a hash of the file's
+    contents. Files the backend fails on get a Validation with an error, which
+    is not cached.
+    """
+    results: Dict[str, Validation] = {}
+    keys = {}
+    for path in paths:
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()
+        keys[path] = ResultCache.key(backend.name, digest)
+        cached = cache.get(keys[path]) if cache else None
+        if cached is not None:
+            results[path] = Validation(messages=cached["messages"])
+
+    missing = [path for path in paths if path not in results]
+    if missing:
+        try:
+            validated = backend.validate_many(missing)
+        except (ValidationError, OSError) as e:
+            validated = {}
+            for path in missing:
+                results[path] = Validation(error=str(e))
+        for path, validation in validated.items():
+            results[path] = validation
+            if cache and validation.error is None:
+                cache.put(keys[path], {"messages": validation.messages})
+    return results
+
+def format_feedback(validation: Validation) -> str:
+    """Render a Validation as the feedback shown to graders."""
+    if validation.error:
+        return validation.error
+    if not validation.messages:
+        return "✅ No issues found. HTML is valid."
+    feedback = "⚠️ Issues found:"
+    for msg in validation.messages:
+        line = msg.get('lastLine', '?')
+        msg_text = msg.get('message', '')
+        msg_type = msg.get('type', 'info')
+        feedback += f"\n[{msg_type.upper()}] Line {line}: {msg_text}"
+    return feedback
@@ -0,0 +1,116 @@
+"""An append-only JSON-lines log of grading results that survives quitting and crashes.
+
+Each line is {"student": ..., "result": ...}, written as soon as the student
+is graded and fsynced in batches. A later run reads the journal to skip the
+students already in it, and compact() turns it into the usual
+grading_results.json without holding every result in memory.
+"""
+import os
+import json
+import time
+from typing import Any, Dict, Iterator, Set, Tuple
+
+JOURNAL_SUFFIX = ".journal.jsonl"
+FSYNC_EVERY = 16  # results written between fsyncs
+FSYNC_INTERVAL = 2.0  # seconds; sync sooner than that if results arrive slowly
+
+def journal_path(results_path: str) -> str:
+    """The journal kept next to a results file, e.g. grading_results.journal.jsonl."""
+    return os.path.splitext(results_path)[0] + JOURNAL_SUFFIX
+
+class ResultsJournal:
+    def __init__(self, path: str, fresh: bool = False):
+        self.path = path
+        if fresh and os.path.exists(path):
+            os.remove(path)
+        self.file = open(path, "ab")
+        # A crash can leave half a line at the end; start the next entry on a line of its own
+        if self.file.tell() > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self.file.write(b"\n")
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def _entries(self) -> Iterator[Tuple[int, str]]:
+        """Yield (offset, student) for every complete, readable entry."""
+        with open(self.path, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    student = json.loads(line)["student"]
+                except (ValueError, KeyError, TypeError):
+                    student = None
+                if student is not None:
+                    yield offset, student
+                offset += len(line)
+
+    def graded_students(self) -> Set[str]:
+        """Students with a result in the journal."""
+        self.file.flush()
+        return {student for _, student in self._entries()}
+
+    def append(self, student: str, result: Dict[str, Any]) -> None:
+        line = json.dumps({"student": student, "result": result}) + "\n"
+        self.file.write(line.encode("utf-8"))
+        # Flushed right away so a crash of this process loses nothing; fsync (for power loss) is batched
+        self.file.flush()
+        self.unsynced += 1
+        if self.unsynced >= FSYNC_EVERY or time.monotonic() - self.last_sync >= FSYNC_INTERVAL:
+            self.sync()
+
+    def sync(self) -> None:
+        if self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def results(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield (student, result) sorted by student; a student's latest entry wins.
+
+        Only each student's offset in the journal is kept in memory.
+        """
+        self.file.flush()
+        offsets: Dict[str, int] = {}
+        for offset, student in self._entries():
+            offsets[student] = offset
+        with open(self.path, "rb") as f:
+            for student in sorted(offsets):
+                f.seek(offsets[student])
+                yield student, json.loads(f.readline())["result"]
+
+    def compact(self, results_path: str) -> int:
+        """Write the journal's results to results_path as one JSON object; return how many.
+
+        The output matches json.dump(results, f, indent=2) but is written one
+        student at a time, and replaces results_path atomically.
+        """
+        temp_path = f"{results_path}.{os.getpid()}.tmp"
+        count = 0
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write("{")
+            for student, result in self.results():
+                f.write("," if count else "")
+                f.write(f"\n  {json.dumps(student)}: " + json.dumps(result, indent=2).replace("\n", "\n  "))
+                count += 1
+            f.write("\n}" if count else "}")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, results_path)
+        return count
+
+    def close(self, remove: bool = False) -> None:
+        """Sync and close the journal; remove it once its results are compacted for good."""
+        self.sync()
+        self.file.close()
+        if remove:
+            os.remove(self.path)
+
+    def __enter__(self) -> "ResultsJournal":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if not self.file.closed:
+            self.close()
@@ -0,0 +1,104 @@
+// Builds a queryable index of JavaScript sources with @babel/parser.
+//
+// Reads a JSON array of source strings on stdin and writes a JSON array with
+// one entry per source: either {index: {...}} or {error: "..."} when the
+// source can't be parsed.
+const parser = require('@babel/parser');
+
+function calleeName(callee) {
+    if (callee.type === 'Identifier') {
+        return callee.name;
+    }
+    if ((callee.type === 'MemberExpression' || callee.type === 'OptionalMemberExpression') &&
+        !callee.computed && callee.property.type === 'Identifier') {
+        return callee.property.name;
+    }
+    return null;
+}
+
+// Replace comments with spaces, keeping newlines so line-based checks still line up
+function stripComments(code, comments) {
+    let stripped = '';
+    let position = 0;
+    comments.forEach(comment => {
+        stripped += code.slice(position, comment.start);
+        stripped += code.slice(comment.start, comment.end).replace(/[^\n]/g, ' ');
+        position = comment.end;
+    });
+    return stripped + code.slice(position);
+}
+
+function indexSource(code) {
+    const ast = parser.parse(code, { sourceType: 'unambiguous', errorRecovery: true });
+    const functions = new Set();
+    const calls = new Set();
+    const numbers = new Set();
+    const strings = new Set();
+
+    const stack = [ast.program];
+    while (stack.length) {
+        const node = stack.pop();
+        switch (node.type) {
+            case 'FunctionDeclaration':
+            case 'FunctionExpression':
+                if (node.id) {
+                    functions.add(node.id.name);
+                }
+                break;
+            case 'CallExpression':
+            case 'OptionalCallExpression': {
+                const name = calleeName(node.callee);
+                if (name) {
+                    calls.add(name);
+                }
+                break;
+            }
+            case 'NumericLiteral':
+                numbers.add(node.value);
+                break;
+            case 'StringLiteral':
+                strings.add(node.value);
+                break;
+            case 'TemplateElement':
+                strings.add(node.value.cooked === null ? node.value.raw : node.value.cooked);
+                break;
+        }
+        for (const key of Object.keys(node)) {
+            if (key === 'loc' || key === 'leadingComments' || key === 'trailingComments' || key === 'innerComments') {
+                continue;
+            }
+            const value = node[key];
+            if (Array.isArray(value)) {
+                value.forEach(child => {
+                    if (child && typeof child.type === 'string') {
+                        stack.push(child);
+                    }
+                });
+            } else if (value && typeof value.type === 'string') {
+                stack.push(value);
+            }
+        }
+    }
+
+    return {
+        functions: [...functions],
+        calls: [...calls],
+        numbers: [...numbers],
+        strings: [...strings],
+        source: stripComments(code, ast.comments || [])
+    };
+}
+
+let input = '';
+process.stdin.setEncoding('utf-8');
+process.stdin.on('data', chunk => { input += chunk; });
+process.stdin.on('end', () => {
+    const results = JSON.parse(input).map(code => {
+        try {
+            return { index: indexSource(code) };
+        } catch (e) {
+            return { error: e.message };
+        }
+    });
+    process.stdout.write(JSON.stringify(results));
+});
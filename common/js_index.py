@@ -0,0 +1,164 @@
+"""Indexed views of student JavaScript, parsed once with @babel/parser and cached on disk."""
+import os
+import re
+import json
+import hashlib
+import subprocess
+import multiprocessing
+from dataclasses import dataclass, field, asdict
+from typing import Dict, List, Optional, Sequence, Set
+
+from common.toolchain import get_toolchain, ToolchainError
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+JS_INDEX_SCRIPT = os.path.join(REPO_ROOT, "common", "js_index.js")
+# project2's test runner already installs @babel/parser here, so share it
+NODE_PROJECT_DIR = os.path.join(REPO_ROOT, "project2")
+AST_CACHE_DIR = os.path.join(REPO_ROOT, ".ast_cache")
+# Bump when js_index.js changes what it extracts, so stale cache entries are ignored
+JS_INDEX_VERSION = 1
+PARSE_TIMEOUT = 30  # seconds
+
+_warned = False
+
+@dataclass
+class JSIndex:
+    functions: List[str]     # names of declared (or named) functions
+    calls: List[str]         # names of called functions and methods
+    numbers: List[float]     # numeric literals
+    strings: List[str]       # string and template literal contents
+    source: str              # the source with comments blanked out
+    parsed: bool = True      # False when built by the text fallback
+    _function_set: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+    _call_set: Set[str] = field(default_factory=set, init=False, repr=False, compare=False)
+    _number_set: Set[float] = field(default_factory=set, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self._function_set = set(self.functions)
+        self._call_set = set(self.calls)
+        self._number_set = set(self.numbers)
+
+    # Without a parse (parsed is False) each check is the substring test the rubric made on the raw text
+
+    def declares(self, name: str) -> bool:
+        if not self.parsed:
+            return f"function {name}" in self.source
+        return name in self._function_set
+
+    def calls_function(self, name: str) -> bool:
+        if not self.parsed:
+            return re.search(re.escape(name) + r'.*\(', self.source) is not None
+        return name in self._call_set
+
+    def has_number(self, value: float) -> bool:
+        if not self.parsed:
+            return str(value) in self.source
+        return value in self._number_set
+
+    def has_string_containing(self, text: str) -> bool:
+        """Case-insensitive substring search over every string literal."""
+        text = text.lower()
+        return any(text in string.lower() for string in self.strings)
+
+    def to_json(self) -> Dict:
+        return {name: value for name, value in asdict(self).items() if not name.startswith("_")}
+
+def text_index(code: str) -> JSIndex:
+    """An index over the raw text, for code that node can't parse.
+
+    Its checks are the plain substring tests on the whole file (comments
+    included) that the rubric made before there was a parser, so students
+    graded without one score exactly as they used to.
+    """
+    return JSIndex(
+        functions=[],
+        calls=[],
+        numbers=[],
+        # Without a tokenizer, treat the whole text as one string literal
+        strings=[code],
+        source=code,
+        parsed=False
+    )
+
+def _cache_key(code: str, parser_version: str) -> str:
+    digest = hashlib.sha256()
+    digest.update(f"{JS_INDEX_VERSION}|{parser_version}|".encode("utf-8"))
+    digest.update(code.encode("utf-8"))
+    return digest.hexdigest()
+
+def _load(cache_dir: str, key: str) -> Optional[JSIndex]:
+    try:
+        with open(os.path.join(cache_dir, f"{key}.json"), encoding="utf-8") as f:
+            return JSIndex(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+def _store(cache_dir: str, key: str, index: JSIndex) -> None:
+    path = os.path.join(cache_dir, f"{key}.json")
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(index.to_json(), f)
+        os.replace(temp_path, path)
+    except OSError:
+        pass
+
+def parser_version() -> Optional[str]:
+    """The installed @babel/parser's version, or None if it isn't installed.
+
+    The parser is never installed from here; without it the text fallback is
+    used, with one warning from the main process (workers stay quiet).
+    """
+    global _warned
+    try:
+        return get_toolchain(NODE_PROJECT_DIR, ("@babel/parser",), install=False).packages["@babel/parser"]
+    except ToolchainError as e:
+        if not _warned and multiprocessing.parent_process() is None:
+            _warned = True
+            print(f"Warning: JavaScript is indexed as plain text: {str(e)}")
+        return None
+
+def _parse(sources: Sequence[str]) -> List[Optional[JSIndex]]:
+    toolchain = get_toolchain(NODE_PROJECT_DIR, ("@babel/parser",), install=False)
+    completed = subprocess.run(
+        [toolchain.node, JS_INDEX_SCRIPT],
+        input=json.dumps(list(sources)),
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        env=toolchain.node_env(),
+        timeout=PARSE_TIMEOUT,
+        check=True
+    )
+    return [JSIndex(**result["index"]) if "index" in result else None
+            for result in json.loads(completed.stdout)]
+
+def index_sources(sources: Sequence[str], cache_dir: str = AST_CACHE_DIR) -> List[JSIndex]:
+    """Index several sources, parsing only those missing from the cache in one node run.
+
+    Sources with syntax errors babel can't recover from fall back to
+    text_index(), and that result is cached like any other. If node or the
+    parser is unavailable everything falls back without being cached, so the
+    sources are parsed properly once the toolchain works.
+    """
+    version = parser_version()
+    if version is None:
+        return [text_index(code) for code in sources]
+
+    keys = [_cache_key(code, version) for code in sources]
+    indexes: List[Optional[JSIndex]] = [_load(cache_dir, key) for key in keys]
+    missing = [i for i, index in enumerate(indexes) if index is None]
+    if missing:
+        try:
+            parsed = _parse([sources[i] for i in missing])
+        except (OSError, ValueError, subprocess.SubprocessError):
+            parsed = None
+        if parsed is not None:
+            for i, index in zip(missing, parsed):
+                indexes[i] = index if index is not None else text_index(sources[i])
+                _store(cache_dir, keys[i], indexes[i])
+    return [index if index is not None else text_index(code) for index, code in zip(indexes, sources)]
+
+def index_source(code: str, cache_dir: str = AST_CACHE_DIR) -> JSIndex:
+    return index_sources([code], cache_dir)[0]
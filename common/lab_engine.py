@@ -0,0 +1,189 @@
+"""The checker shared by the JavaScript labs, configured per lab by a LabManifest.
+
+Each lab's checker.py only declares its manifest and calls run_lab(), so a new
+lab needs nothing else:
+
+    LAB = LabManifest(html_file="page.html", css_file="styles.css",
+                      expected_js_file="page.js", behaviors=BEHAVIORS)
+
+    if __name__ == "__main__":
+        run_lab(LAB)
+"""
+import os
+import json
+import bisect
+import argparse
+import textwrap
+import webbrowser
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from common.sandbox import Sandbox
+from common.dom_harness import format_behavior_results, run_behaviors
+from common.preview_server import PreviewServer
+from common.scan import find_file_by_extension, list_subdirectories
+from common.staging import StagedTemplate
+from common.toolchain import ToolchainError
+
+@dataclass
+class LabManifest:
+    html_file: str
+    css_file: str
+    expected_js_file: str
+    behaviors: List[dict] = field(default_factory=list)  # see common/dom_harness.py
+    trace_behavior: Optional[dict] = None  # a behavior with a trace step, run on its own by --trace
+    misnamed_js_penalty: str = ""  # appended to the warning about a misnamed JS file
+    template_dir: str = "./website_template"
+    submissions_dir: str = "./processed_submissions"
+
+    @property
+    def template_files(self) -> List[str]:
+        return [self.html_file, self.css_file]
+
+def report_js_filename(lab: LabManifest, js_file: str) -> None:
+    """Tell the grader whether the student's JS file has the name the HTML expects."""
+    js_filename = os.path.basename(js_file)
+    if js_filename != lab.expected_js_file:
+        print(f"Expected '{lab.expected_js_file}' but found '{js_filename}'\nMake sure to name your JS file {lab.expected_js_file}, otherwise it doesn't connect to the HTML file{lab.misnamed_js_penalty}")
+    else:
+        print("JS FILE NAMED CORRECTLY")
+
+def setup_and_run_submission(lab: LabManifest, template: StagedTemplate, submission_path: str) -> Optional[Sandbox]:
+    """Open the student's page in a view of the staged template; return the view to clean up later."""
+    js_file = find_file_by_extension(submission_path, "js")
+    if not js_file:
+        print(f"No JavaScript file found in {submission_path}")
+        return None
+
+    try:
+        # The student's JS is linked in under the name the HTML expects
+        view = template.view({lab.expected_js_file: js_file}, label="run")
+    except OSError as e:
+        print(f"Error setting up submission: {str(e)}")
+        return None
+    report_js_filename(lab, js_file)
+
+    html_path = os.path.join(view.path, lab.html_file)
+    print(f"\nOpening {html_path} in browser...")
+    webbrowser.open(f"file://{os.path.abspath(html_path)}")
+    return view
+
+def preview_submission(lab: LabManifest, server: PreviewServer, student_dir: str, submission_path: str) -> None:
+    """Point the grader at the student's page on the preview server."""
+    js_file = find_file_by_extension(submission_path, "js")
+    if not js_file:
+        print(f"No JavaScript file found in {submission_path}")
+        return
+    report_js_filename(lab, js_file)
+    print(f"\nPreview: {server.student_url(student_dir)}")
+
+def test_behaviors(lab: LabManifest, student_dirs: List[str], behaviors: Optional[List[dict]] = None,
+                   jobs: int = 1) -> Dict[str, List[dict]]:
+    """Run the lab's behaviors (or the ones given) for every student; empty if node isn't available."""
+    scripts = {student_dir: find_file_by_extension(os.path.join(lab.submissions_dir, student_dir), "js")
+               for student_dir in student_dirs}
+    print(f"Running behavior tests for {len(scripts)} students...")
+    try:
+        return run_behaviors(os.path.join(lab.template_dir, lab.html_file), scripts,
+                             lab.behaviors if behaviors is None else behaviors, jobs)
+    except ToolchainError as e:
+        print(f"Skipping behavior tests: {str(e)}")
+        return {}
+
+def print_trace(result: dict) -> None:
+    """Show a trace-mode result with the values recorded at each virtual tick."""
+    print("Trace matches" if result["passed"] else f"Trace differs: {result['detail']}")
+    if "trace" in result:
+        print(textwrap.fill(" ".join(result["trace"]), width=100, initial_indent="  ", subsequent_indent="  "))
+
+def parse_args(lab: LabManifest) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description='Run student submissions')
+    parser.add_argument('--student', type=str, help='Student login to start from', default=None)
+    parser.add_argument('--no-server', action='store_true', help='Stage each submission in a temp folder and open it as a file instead')
+    parser.add_argument('--port', type=int, default=0, help='Port for the preview server (default: any free port)')
+    parser.add_argument('--batch', action='store_true', help='Only run the behavior tests for every student and save them to behavior_results.json')
+    if lab.trace_behavior:
+        parser.add_argument('--trace', action='store_true', help=f"Only run '{lab.trace_behavior['name']}' on a virtual clock, compare the recorded values with the expected trace and save them to trace_results.json")
+    parser.add_argument('--no-tests', action='store_true', help="Don't run the behavior tests before the review")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of node processes running the behavior tests')
+    return parser.parse_args()
+
+def run_lab(lab: LabManifest) -> None:
+    """The lab checker's command line: batch behavior tests, traces or interactive review."""
+    args = parse_args(lab)
+
+    # Get list of student directories and sort alphabetically
+    student_dirs = list_subdirectories(lab.submissions_dir)
+
+    if getattr(args, "trace", False):
+        trace_results = test_behaviors(lab, student_dirs, [lab.trace_behavior], args.jobs)
+        for student_dir, results in trace_results.items():
+            print(f"\n{student_dir}")
+            print_trace(results[0])
+        with open("trace_results.json", "w") as f:
+            json.dump({student_dir: results[0] for student_dir, results in trace_results.items()}, f, indent=2)
+        return
+
+    if args.batch:
+        behavior_results = test_behaviors(lab, student_dirs, jobs=args.jobs)
+        for student_dir, results in behavior_results.items():
+            print(f"\n{student_dir}")
+            print(format_behavior_results(results))
+        with open("behavior_results.json", "w") as f:
+            json.dump(behavior_results, f, indent=2)
+        return
+
+    # Find starting index based on provided student login
+    start_index = 0
+    if args.student:
+        start_index = bisect.bisect_left(student_dirs, args.student)
+        if start_index == len(student_dirs) or student_dirs[start_index] != args.student:
+            print(f"Student {args.student} not found. Starting with next student alphabetically.")
+        if start_index == len(student_dirs):
+            start_index = 0
+            print("Wrapping around to the beginning of the list.")
+
+    # Reorder the list to start from the selected student
+    student_dirs = student_dirs[start_index:] + student_dirs[:start_index]
+
+    behavior_results = {} if args.no_tests else test_behaviors(lab, student_dirs, jobs=args.jobs)
+
+    # One server previews the whole class in place; the gallery page links every student.
+    # Without it, the template is staged once and each student gets a linked view of it.
+    server = None
+    template = None
+    if args.no_server:
+        template = StagedTemplate(lab.template_dir, lab.template_files)
+    else:
+        server = PreviewServer(lab.template_dir, lab.submissions_dir, lab.html_file, lab.expected_js_file,
+                               port=args.port).start()
+        print(f"Previewing submissions at {server.index_url}")
+        webbrowser.open(server.index_url)
+
+    try:
+        for student_dir in student_dirs:
+            print("\n" + "=" * 60)
+            print(f"Student: {student_dir}")
+            print("=" * 60)
+
+            submission_path = os.path.join(lab.submissions_dir, student_dir)
+            if student_dir in behavior_results:
+                print(format_behavior_results(behavior_results[student_dir]))
+            view = None
+            if server:
+                preview_submission(lab, server, student_dir, submission_path)
+            else:
+                view = setup_and_run_submission(lab, template, submission_path)
+
+            print("\nPress Enter to continue to next submission (or 'q' to quit)...")
+            answer = input().lower()
+            # The view stays around while the page is open and is removed once we move on
+            if view:
+                view.cleanup()
+            if answer == 'q':
+                break
+    finally:
+        if server:
+            server.close()
+        if template:
+            template.cleanup()
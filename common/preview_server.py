@@ -0,0 +1,153 @@
+"""A local web server previewing every student's submission in the lab's page template.
+
+Student pages live under /student/<login>/: the template's HTML is served at
+that path, requests for the expected JS file name get the student's own JS
+file, and every other name comes from the template directory (or, failing
+that, the student's folder). Nothing is copied. The root path serves a
+gallery listing the whole class next to an iframe showing one submission.
+"""
+import os
+import html
+import threading
+import mimetypes
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+from urllib.parse import quote, unquote, urlparse
+
+from common.scan import find_file_by_extension, list_subdirectories
+
+GALLERY_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+<style>
+  body {{ margin: 0; display: flex; height: 100vh; font-family: sans-serif; }}
+  nav {{ width: 16em; overflow-y: auto; border-right: 1px solid #ccc; padding: 0.5em; }}
+  nav a {{ display: block; padding: 0.2em 0.4em; color: inherit; }}
+  nav a.missing {{ color: #a00; }}
+  iframe {{ flex: 1; border: 0; }}
+</style>
+</head>
+<body>
+<nav>
+<h3>{title}</h3>
+{links}
+</nav>
+<iframe name="preview" src="{first}"></iframe>
+</body>
+</html>
+"""
+
+def _within(directory: str, name: str) -> Optional[str]:
+    """Path of name inside directory, or None if it would escape it or doesn't exist."""
+    root = os.path.realpath(directory)
+    path = os.path.realpath(os.path.join(root, name))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        return None
+    return path
+
+class PreviewServer:
+    def __init__(self, template_dir: str, submissions_dir: str, html_file: str, expected_js_file: str,
+                 host: str = "127.0.0.1", port: int = 0):
+        self.template_dir = os.path.abspath(template_dir)
+        self.submissions_dir = os.path.abspath(submissions_dir)
+        self.html_file = html_file
+        self.expected_js_file = expected_js_file
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def index_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def student_url(self, login: str) -> str:
+        return f"{self.index_url}student/{quote(login)}/"
+
+    def start(self) -> "PreviewServer":
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def close(self) -> None:
+        if self.thread:
+            self.httpd.shutdown()
+            self.thread = None
+        self.httpd.server_close()
+
+    def __enter__(self) -> "PreviewServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def gallery(self) -> str:
+        links = []
+        students = list_subdirectories(self.submissions_dir)
+        for login in students:
+            has_js = find_file_by_extension(os.path.join(self.submissions_dir, login), "js") is not None
+            links.append(f'<a href="/student/{quote(login)}/" target="preview"'
+                         f'{"" if has_js else " class=missing"}>{html.escape(login)}</a>')
+        title = f"{html.escape(self.html_file)} submissions"
+        first = f"/student/{quote(students[0])}/" if students else "about:blank"
+        return GALLERY_TEMPLATE.format(title=title, links="\n".join(links), first=first)
+
+    def resolve(self, login: str, name: str) -> Optional[str]:
+        """The file to serve for /student/<login>/<name>."""
+        if login in (".", "..") or "/" in login or "\\" in login:
+            return None
+        submission_path = os.path.join(self.submissions_dir, login)
+        if not os.path.isdir(submission_path):
+            return None
+        if name in ("", self.html_file):
+            return _within(self.template_dir, self.html_file)
+        if name == self.expected_js_file:
+            return find_file_by_extension(submission_path, "js")
+        return _within(self.template_dir, name) or _within(submission_path, name)
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = unquote(urlparse(self.path).path)
+                if path in ("/", "/index.html"):
+                    self.send_body(server.gallery().encode("utf-8"), "text/html; charset=utf-8")
+                    return
+                parts = path.split("/", 3)
+                if len(parts) < 3 or parts[1] != "student" or not parts[2]:
+                    self.send_error(404)
+                    return
+                if len(parts) == 3:
+                    # Relative links in the page only resolve under the trailing slash
+                    self.send_response(301)
+                    self.send_header("Location", f"/student/{quote(parts[2])}/")
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                file_path = server.resolve(parts[2], parts[3])
+                if not file_path:
+                    self.send_error(404)
+                    return
+                with open(file_path, "rb") as f:
+                    body = f.read()
+                content_type = mimetypes.guess_type(file_path)[0] or "application/octet-stream"
+                if content_type.startswith("text/") or content_type.endswith("javascript"):
+                    content_type += "; charset=utf-8"
+                self.send_body(body, content_type)
+
+            def send_body(self, body: bytes, content_type: str) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                # Every student's page uses the same file names, so never reuse a cached copy
+                self.send_header("Cache-Control", "no-store")
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,78 @@
+"""Persistent cache of rubric item results keyed by what they were computed from."""
+import os
+import json
+import hashlib
+import inspect
+from typing import Any, Dict, Iterable, Optional
+
+def hash_file(path: str) -> str:
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def hash_files(paths: Iterable[str]) -> str:
+    """Combined digest of several files' names and contents, independent of order."""
+    digest = hashlib.sha256()
+    for path in sorted(paths, key=os.path.basename):
+        digest.update(f"{os.path.basename(path)}:{hash_file(path)}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+def hash_sources(*objects: Any) -> str:
+    """Combined digest of the source code of classes and functions."""
+    digest = hashlib.sha256()
+    for obj in objects:
+        try:
+            source = inspect.getsource(obj)
+        except (OSError, TypeError):
+            source = ""
+        digest.update(source.encode("utf-8"))
+    return digest.hexdigest()
+
+def rubric_item_fingerprint(item: Any, engine: str = "") -> str:
+    """Identify a rubric item's grading logic: its name, version, class source and engine.
+
+    engine is a digest of only the helpers every item shares (see hash_sources
+    and hash_files), so editing one of them invalidates every item while
+    editing one item's class regrades just that item. Bump the item's
+    `version` for changes outside both.
+    """
+    return f"{item.name}|{getattr(item, 'version', 1)}|{hash_sources(type(item))}|{engine}"
+
+class ResultCache:
+    """Rubric item results stored as one JSON file per key under cache_dir."""
+    def __init__(self, cache_dir: str, enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+
+    @staticmethod
+    def key(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        if not self.enabled:
+            return
+        path = self._path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f)
+            os.replace(temp_path, path)
+        except OSError:
+            # Caching is only an optimization
+            pass
@@ -0,0 +1,110 @@
+"""Per-submission scratch directories that never collide and always get cleaned up."""
+import os
+import sys
+import atexit
+import shutil
+import signal
+import tempfile
+import threading
+from typing import Optional, Set
+
+# Every sandbox directory name starts with this prefix followed by the owning pid
+SANDBOX_PREFIX = "cs111-"
+# Set this to force sandboxes under a specific directory
+SANDBOX_ROOT_ENV = "CS111_SANDBOX_DIR"
+
+_active: Set[str] = set()
+_lock = threading.Lock()
+_initialized = False
+
+def sandbox_root() -> str:
+    """Return the directory new sandboxes are created in.
+
+    Prefers tmpfs (/dev/shm) so scratch files never touch the disk, and falls
+    back to the system temp directory when it is missing or not writable.
+    """
+    override = os.environ.get(SANDBOX_ROOT_ENV)
+    if override:
+        os.makedirs(override, exist_ok=True)
+        return override
+    if os.path.isdir("/dev/shm") and os.access("/dev/shm", os.W_OK | os.X_OK):
+        return "/dev/shm"
+    return tempfile.gettempdir()
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def reap_stale_sandboxes(root: Optional[str] = None) -> None:
+    """Remove sandboxes left behind by grader processes that no longer exist."""
+    # os.kill(pid, 0) terminates the process on Windows, so only reap on POSIX
+    if os.name != "posix":
+        return
+    root = root or sandbox_root()
+    try:
+        entries = list(os.scandir(root))
+    except OSError:
+        return
+    for entry in entries:
+        if not entry.name.startswith(SANDBOX_PREFIX) or not entry.is_dir(follow_symlinks=False):
+            continue
+        try:
+            pid = int(entry.name[len(SANDBOX_PREFIX):].split("-", 1)[0])
+        except ValueError:
+            continue
+        if pid != os.getpid() and not _pid_alive(pid):
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def _cleanup_all() -> None:
+    with _lock:
+        paths = list(_active)
+        _active.clear()
+    for path in paths:
+        shutil.rmtree(path, ignore_errors=True)
+
+def _exit_on_signal(signum, frame) -> None:
+    # Turn the signal into a normal exit so the atexit cleanup still runs
+    sys.exit(128 + signum)
+
+def _initialize() -> None:
+    global _initialized
+    with _lock:
+        if _initialized:
+            return
+        _initialized = True
+    atexit.register(_cleanup_all)
+    if threading.current_thread() is threading.main_thread():
+        for signum in (signal.SIGTERM, getattr(signal, "SIGHUP", None)):
+            if signum is not None and signal.getsignal(signum) is signal.SIG_DFL:
+                signal.signal(signum, _exit_on_signal)
+    reap_stale_sandboxes()
+
+class Sandbox:
+    """A unique scratch directory for one submission.
+
+    Use it as a context manager; the directory is removed on exit, at
+    interpreter shutdown if it is still around, or by the next grader run if
+    this process crashed before either could happen.
+    """
+    def __init__(self, label: str = "run"):
+        _initialize()
+        prefix = f"{SANDBOX_PREFIX}{os.getpid()}-{label}-"
+        self.path = tempfile.mkdtemp(prefix=prefix, dir=sandbox_root())
+        with _lock:
+            _active.add(self.path)
+
+    def cleanup(self) -> None:
+        with _lock:
+            _active.discard(self.path)
+        shutil.rmtree(self.path, ignore_errors=True)
+
+    def __enter__(self) -> str:
+        return self.path
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.cleanup()
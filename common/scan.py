@@ -0,0 +1,61 @@
+"""Directory listings built with one os.scandir call per directory."""
+import os
+import functools
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+@dataclass(frozen=True)
+class DirListing:
+    path: str
+    files: List[str]  # paths of regular files, in directory order
+    dirs: List[str]   # paths of subdirectories, in directory order
+
+    def files_by_extension(self) -> Dict[str, List[str]]:
+        """Bucket the files by extension (without the dot)."""
+        buckets: Dict[str, List[str]] = {}
+        for path in self.files:
+            buckets.setdefault(os.path.splitext(path)[1][1:], []).append(path)
+        return buckets
+
+    def find_file(self, extension: str) -> Optional[str]:
+        """Return the first file with the given extension, if any."""
+        suffix = f".{extension}"
+        for path in self.files:
+            if path.endswith(suffix):
+                return path
+        return None
+
+def scan_dir(path: str, include_hidden: bool = False) -> DirListing:
+    """List a directory's files and subdirectories without a stat call per entry.
+
+    The entry types come from os.scandir, which on most filesystems reads them
+    along with the names. Hidden entries are skipped unless include_hidden, the
+    same way glob's "*" skips them.
+    """
+    files = []
+    dirs = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if not include_hidden and entry.name.startswith('.'):
+                continue
+            if entry.is_file():
+                files.append(entry.path)
+            elif entry.is_dir():
+                dirs.append(entry.path)
+    return DirListing(path, files, dirs)
+
+@functools.lru_cache(maxsize=256)
+def _cached_scan(path: str) -> DirListing:
+    return scan_dir(path)
+
+def find_file_by_extension(directory: str, extension: str) -> Optional[str]:
+    """Find the first file with the given extension in the directory.
+
+    Listings are memoized per process, since submissions don't change while
+    they're being graded.
+    """
+    return _cached_scan(directory).find_file(extension)
+
+def list_subdirectories(path: str) -> List[str]:
+    """Sorted names of the directories directly inside path."""
+    return sorted(os.path.basename(directory) for directory in scan_dir(path, include_hidden=True).dirs)
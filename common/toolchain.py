@@ -0,0 +1,171 @@
+"""One-time discovery of the node toolchain used by the JavaScript graders."""
+import os
+import json
+import shutil
+import threading
+import subprocess
+from dataclasses import dataclass, asdict
+from typing import Dict, Optional, Sequence
+
+# Name of the file a discovered toolchain is persisted to inside the project directory
+TOOLCHAIN_CACHE_FILE = ".toolchain.json"
+NPM_INSTALL_TIMEOUT = 300  # seconds
+
+class ToolchainError(Exception):
+    """Raised when node or a required package can't be found or installed."""
+
+@dataclass
+class Toolchain:
+    node: str                 # absolute path to the node binary
+    node_version: str
+    node_modules: str         # directory the required packages were found in
+    packages: Dict[str, str]  # package name -> installed version
+
+    def node_env(self) -> Dict[str, str]:
+        """Environment for node processes that need the local packages."""
+        return dict(os.environ, NODE_PATH=self.node_modules)
+
+    def binary(self, name: str) -> Optional[str]:
+        """Absolute path to a locally installed package binary such as mocha."""
+        path = os.path.join(self.node_modules, ".bin", name)
+        return path if os.path.isfile(path) else None
+
+_toolchains: Dict[str, Toolchain] = {}
+_failures: Dict[str, ToolchainError] = {}
+_lock = threading.Lock()
+
+def _node_fingerprint(node: str) -> str:
+    stat = os.stat(node)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def _find_package(start_dir: str, package: str) -> Optional[str]:
+    """Walk up from start_dir the way node does; return the package's node_modules dir."""
+    directory = os.path.abspath(start_dir)
+    while True:
+        node_modules = os.path.join(directory, "node_modules")
+        if os.path.isfile(os.path.join(node_modules, package, "package.json")):
+            return node_modules
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return None
+        directory = parent
+
+def _package_version(node_modules: str, package: str) -> str:
+    with open(os.path.join(node_modules, package, "package.json"), encoding="utf-8") as f:
+        return json.load(f).get("version", "")
+
+def _resolve_packages(project_dir: str, packages: Sequence[str]) -> Optional[str]:
+    locations = {_find_package(project_dir, package) for package in packages}
+    if len(locations) == 1 and None not in locations:
+        return locations.pop()
+    return None
+
+def _read_cache_file(cache_path: str) -> Dict[str, dict]:
+    try:
+        with open(cache_path, encoding="utf-8") as f:
+            entries = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return entries if isinstance(entries, dict) else {}
+
+def _load_cached(cache_path: str, key: str, node: str, packages: Sequence[str]) -> Optional[Toolchain]:
+    cached = _read_cache_file(cache_path).get(key)
+    try:
+        toolchain = Toolchain(**cached["toolchain"])
+    except (KeyError, TypeError):
+        return None
+    # Trust the cache only while node and every package are still where we left them
+    if toolchain.node != node or cached.get("node_fingerprint") != _node_fingerprint(node):
+        return None
+    for package in packages:
+        if package not in toolchain.packages:
+            return None
+        try:
+            if _package_version(toolchain.node_modules, package) != toolchain.packages[package]:
+                return None
+        except (OSError, ValueError):
+            return None
+    return toolchain
+
+def _save_cached(cache_path: str, key: str, toolchain: Toolchain) -> None:
+    entries = _read_cache_file(cache_path)
+    entries[key] = {"node_fingerprint": _node_fingerprint(toolchain.node),
+                    "toolchain": asdict(toolchain)}
+    temp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, cache_path)
+    except OSError:
+        # Persisting is only an optimization
+        pass
+
+def _discover(project_dir: str, packages: Sequence[str], persist: bool, install: bool) -> Toolchain:
+    node = shutil.which("node")
+    if not node:
+        raise ToolchainError("Node.js is not installed or not on PATH.")
+    node = os.path.realpath(node)
+
+    cache_path = os.path.join(project_dir, TOOLCHAIN_CACHE_FILE)
+    cache_key = ",".join(sorted(packages))
+    if persist:
+        cached = _load_cached(cache_path, cache_key, node, packages)
+        if cached:
+            return cached
+
+    # Scripts that only need node itself don't resolve (or install) anything
+    node_modules = _resolve_packages(project_dir, packages) if packages else ""
+    if node_modules is None and not install:
+        raise ToolchainError(f"{', '.join(packages)} is not installed; run npm install in {project_dir}.")
+    if node_modules is None:
+        npm = shutil.which("npm")
+        if not npm:
+            raise ToolchainError(f"npm is needed to install {', '.join(packages)}.")
+        try:
+            subprocess.run([npm, "install", *packages, "--no-save"], cwd=project_dir,
+                           check=True, capture_output=True, timeout=NPM_INSTALL_TIMEOUT)
+        except subprocess.CalledProcessError as e:
+            raise ToolchainError(f"Failed to install {', '.join(packages)}: {e.stderr.decode(errors='replace')}")
+        except subprocess.TimeoutExpired:
+            raise ToolchainError(f"Timed out installing {', '.join(packages)}.")
+        node_modules = _resolve_packages(project_dir, packages)
+        if node_modules is None:
+            raise ToolchainError(f"Could not find {', '.join(packages)} after installing them.")
+
+    try:
+        node_version = subprocess.run([node, "--version"], check=True, capture_output=True,
+                                      text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError) as e:
+        raise ToolchainError(f"Could not run node: {str(e)}")
+
+    toolchain = Toolchain(
+        node=node,
+        node_version=node_version,
+        node_modules=node_modules,
+        packages={package: _package_version(node_modules, package) for package in packages}
+    )
+    if persist:
+        _save_cached(cache_path, cache_key, toolchain)
+    return toolchain
+
+def get_toolchain(project_dir: str, packages: Sequence[str] = ("@babel/parser",),
+                  persist: bool = True, install: bool = True) -> Toolchain:
+    """Return the node toolchain for project_dir, discovering it at most once per process.
+
+    Packages are looked up the way node resolves them, starting at project_dir,
+    and, with install, installed there with npm if missing. With persist, the result is also
+    written to TOOLCHAIN_CACHE_FILE so later runs skip the discovery entirely.
+    Raises ToolchainError if the toolchain is unusable.
+    """
+    key = f"{os.path.abspath(project_dir)}|{','.join(sorted(packages))}|{install}"
+    with _lock:
+        # Remember failures too, so a broken setup isn't probed again for every student
+        if key in _failures:
+            raise _failures[key]
+        if key not in _toolchains:
+            try:
+                _toolchains[key] = _discover(os.path.abspath(project_dir), list(packages), persist, install)
+            except ToolchainError as e:
+                _failures[key] = e
+                raise
+        return _toolchains[key]
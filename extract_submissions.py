@@ -1,41 +1,173 @@
 import os
 import zipfile
 import shutil
+import json
 import argparse
+from dataclasses import dataclass, asdict, field
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from common.result_cache import hash_file
+from common.scan import scan_dir
+
+# Records what every student folder in the target directory was built from
+MANIFEST_FILE = ".manifest.json"
+MANIFEST_VERSION = 1
+
+# Default limits on what a single zip submission may unpack to
+MAX_TOTAL_MB = 200
+MAX_FILE_MB = 50
+MAX_MEMBERS = 2000
+SKIP_DIRS = ["node_modules", ".git"]
+
+@dataclass
+class StudentExtraction:
+    login: str
+    folder: str
+    messages: List[str]  # warnings and errors from extracting this student's files
+    failures: List[str]  # names of the student's files that couldn't be processed
+    extracted: bool      # False if the folder was already up to date
+
+@dataclass
+class ZipLimits:
+    max_total_bytes: int = MAX_TOTAL_MB * 1024 * 1024
+    max_file_bytes: int = MAX_FILE_MB * 1024 * 1024
+    max_members: int = MAX_MEMBERS
+    # Directories left out of the extraction wherever they appear in an archive
+    skip_dirs: List[str] = field(default_factory=lambda: list(SKIP_DIRS))
+
+def add_limit_arguments(parser):
+    """Add the zip safety limit options, shared with pipeline.py."""
+    parser.add_argument('--max-total-mb', type=float, default=MAX_TOTAL_MB,
+                        help='Reject zips that unpack to more than this many megabytes')
+    parser.add_argument('--max-file-mb', type=float, default=MAX_FILE_MB,
+                        help='Reject zips containing a file larger than this many megabytes')
+    parser.add_argument('--max-members', type=int, default=MAX_MEMBERS,
+                        help='Reject zips with more than this many entries')
+    parser.add_argument('--skip', nargs='*', default=SKIP_DIRS, metavar='DIR',
+                        help='Directory names left out of extracted zips (default: node_modules .git)')
+
+def limits_from_args(args):
+    return ZipLimits(
+        max_total_bytes=int(args.max_total_mb * 1024 * 1024),
+        max_file_bytes=int(args.max_file_mb * 1024 * 1024),
+        max_members=args.max_members,
+        skip_dirs=list(args.skip)
+    )
 
 def parse_args():
     parser = argparse.ArgumentParser(description='Process student submissions from a directory.')
     parser.add_argument('submissions_dir', help='Directory containing the student submissions')
     parser.add_argument('target_dir', help='Directory where processed submissions will be stored')
+    parser.add_argument('--jobs', type=int, default=1, help='Number of students to extract concurrently')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the manifest and re-extract every submission')
+    add_limit_arguments(parser)
     return parser.parse_args()
 
-# Specify the directory containing the files
-def find_content_directory(folder_path):
-    """Find the directory level that contains actual files."""
-    contents = os.listdir(folder_path)
-    # Filter out __MACOSX directory
-    contents = [item for item in contents if item != '__MACOSX']
-    
-    dirs = [item for item in contents if os.path.isdir(os.path.join(folder_path, item))]
-    files = [item for item in contents if os.path.isfile(os.path.join(folder_path, item))]
-    
-    # If we have files at this level, this is our target
-    if files:
-        return folder_path
-    
-    # If we have more than one directory and no files, that's an error case
-    if len(dirs) > 1:
-        return None
-    
-    # If we have exactly one directory, go deeper
-    if len(dirs) == 1:
-        return find_content_directory(os.path.join(folder_path, dirs[0]))
-    
-    # If we have no files and no directories, return None
+def find_content_root(names):
+    """Find the archive path prefix that contains actual files, from a zip's member names.
+
+    Starting at the archive root (and ignoring __MACOSX), the first level with
+    any files is the content root; a level with no files but exactly one
+    directory descends into it. Returns '' for the archive root, a prefix such
+    as 'project/src/', or None if a level has no files and several
+    directories, or nothing at all.
+    """
+    prefix = ""
+    while True:
+        dirs = set()
+        files = set()
+        for name in names:
+            if not name.startswith(prefix):
+                continue
+            head, separator, _ = name[len(prefix):].partition("/")
+            # Filter out __MACOSX directory
+            if not head or head == "__MACOSX":
+                continue
+            if separator:
+                dirs.add(head)
+            else:
+                files.add(head)
+        
+        # If we have files at this level, this is our target
+        if files:
+            return prefix
+        
+        # If we have exactly one directory, go deeper; otherwise it's an error case
+        if len(dirs) != 1:
+            return None
+        prefix += dirs.pop() + "/"
+
+def safe_member_name(info):
+    """Normalize an archive member name the way extractall would, using '/' separators.
+
+    Drive letters and '', '.' and '..' components are dropped; directories keep
+    their trailing slash. Returns '' if nothing is left.
+    """
+    name = os.path.splitdrive(info.filename.replace("\\", "/"))[1]
+    parts = [part for part in name.split("/") if part not in ("", ".", "..")]
+    if not parts:
+        return ""
+    return "/".join(parts) + ("/" if info.is_dir() else "")
+
+def is_unsafe_member(info):
+    """Whether a member would land outside the folder it's extracted into."""
+    name = info.filename.replace("\\", "/")
+    return (name.startswith("/") or bool(os.path.splitdrive(name)[0])
+            or ".." in name.split("/"))
+
+def skipped_dir(name, skip_dirs):
+    """The skipped directory a safe member name lies inside, or None."""
+    for directory in name.split("/")[:-1]:
+        if directory in skip_dirs:
+            return directory
+    return None
+
+def check_zip_limits(members, limits):
+    """Return why the (info, safe name) members exceed the limits, or None if they don't."""
+    if len(members) > limits.max_members:
+        return f"{len(members)} entries, limit is {limits.max_members}"
+    total_bytes = 0
+    for info, name in members:
+        if info.file_size > limits.max_file_bytes:
+            return f"{name} is {info.file_size} bytes, limit is {limits.max_file_bytes}"
+        total_bytes += info.file_size
+    if total_bytes > limits.max_total_bytes:
+        return f"{total_bytes} bytes uncompressed, limit is {limits.max_total_bytes}"
     return None
 
-def process_submission(file_path, student_folder, temp_directory):
-    """Process a single submission file."""
+def stream_zip_members(zip_ref, members, content_root, student_folder, log=print):
+    """Write every (info, safe name) member under content_root straight into the student folder."""
+    existing = set(os.listdir(student_folder))
+    skipped = set()
+    for info, name in members:
+        if not name.startswith(content_root) or name == content_root:
+            continue
+        relative_path = name[len(content_root):]
+        
+        item = relative_path.split("/")[0]
+        if item in existing:
+            if item not in skipped:
+                log(f"Warning: {item} already exists in {student_folder}")
+                skipped.add(item)
+            continue
+        
+        target_path = os.path.join(student_folder, *relative_path.rstrip("/").split("/"))
+        if info.is_dir():
+            os.makedirs(target_path, exist_ok=True)
+            continue
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        # ZipExtFile never returns more than info.file_size bytes, which check_zip_limits bounded
+        with zip_ref.open(info) as source, open(target_path, "wb") as target:
+            shutil.copyfileobj(source, target)
+
+def process_submission(file_path, student_folder, limits=None, log=print):
+    """Process a single submission file, reporting problems through log.
+
+    Zips are checked against limits from their headers alone, before anything
+    is written, and rejected if too large or if any entry escapes the folder.
+    """
+    limits = limits or ZipLimits()
     file_name = os.path.basename(file_path)
     
     # Create student folder if it doesn't exist
@@ -43,34 +175,38 @@ def process_submission(file_path, student_folder, temp_directory):
     
     # Handle zip archives
     if zipfile.is_zipfile(file_path):
-        temp_extract_path = os.path.join(temp_directory, os.path.splitext(file_name)[0])
-        os.makedirs(temp_extract_path, exist_ok=True)
-        
         with zipfile.ZipFile(file_path, 'r') as zip_ref:
+            unsafe = [info.filename for info in zip_ref.infolist() if is_unsafe_member(info)]
+            if unsafe:
+                log(f"Error processing {file_name}: unsafe path {unsafe[0]}")
+                return False
+            
             # Filter out __MACOSX directory during extraction
-            members = [m for m in zip_ref.namelist() if not m.startswith('__MACOSX/')]
-            zip_ref.extractall(temp_extract_path, members=members)
-        
-        # Find the directory containing actual content
-        content_dir = find_content_directory(temp_extract_path)
-        
-        if content_dir is None:
-            print(f"Error processing {file_name}: Multiple subdirectories found at same level or no files found")
-            return False
-        
-        # Copy all contents to student folder
-        for item in os.listdir(content_dir):
-            source_path = os.path.join(content_dir, item)
-            target_path = os.path.join(student_folder, item)
+            members = [(info, safe_member_name(info)) for info in zip_ref.infolist()
+                       if not info.filename.startswith('__MACOSX/')]
+            members = [(info, name) for info, name in members if name]
             
-            if os.path.exists(target_path):
-                print(f"Warning: {item} already exists in {student_folder}")
-                continue
-                
-            if os.path.isfile(source_path):
-                shutil.copy2(source_path, target_path)
-            else:
-                shutil.copytree(source_path, target_path)
+            skipped = [skipped_dir(name, limits.skip_dirs) for _, name in members]
+            if any(skipped):
+                found = sorted(set(directory for directory in skipped if directory))
+                log(f"Skipped {sum(1 for directory in skipped if directory)} entries under "
+                    f"{', '.join(found)} in {file_name}")
+                members = [member for member, directory in zip(members, skipped) if not directory]
+            
+            too_large = check_zip_limits(members, limits)
+            if too_large:
+                log(f"Error processing {file_name}: submission too large ({too_large})")
+                return False
+            
+            # Find the directory containing actual content from the member names alone
+            content_root = find_content_root([name for _, name in members])
+            
+            if content_root is None:
+                log(f"Error processing {file_name}: Multiple subdirectories found at same level or no files found")
+                return False
+            
+            # Extract the content straight into the student folder
+            stream_zip_members(zip_ref, members, content_root, student_folder, log)
     
     # Handle raw files
     else:
@@ -86,55 +222,184 @@ def process_submission(file_path, student_folder, temp_directory):
         target_path = os.path.join(student_folder, base_name)
         
         if os.path.exists(target_path):
-            print(f"Warning: {base_name} already exists in {student_folder}")
+            log(f"Warning: {base_name} already exists in {student_folder}")
             return False
             
         shutil.copy2(file_path, target_path)
     
     return True
 
+def list_outputs(student_folder):
+    """Relative paths of every file currently in a student folder."""
+    outputs = set()
+    for root, _, files in os.walk(student_folder):
+        for name in files:
+            outputs.add(os.path.relpath(os.path.join(root, name), student_folder).replace(os.sep, "/"))
+    return outputs
+
+def process_student(student_folder, file_paths, limits):
+    """Rebuild one student's folder from their files, in order.
+
+    Returns (messages, failed file names, {file name: outputs it produced}).
+    """
+    if os.path.exists(student_folder):
+        shutil.rmtree(student_folder)
+    messages = []
+    failures = []
+    outputs = {}
+    for file_path in file_paths:
+        file_name = os.path.basename(file_path)
+        before = list_outputs(student_folder)
+        try:
+            success = process_submission(file_path, student_folder, limits, log=messages.append)
+        except (OSError, zipfile.BadZipFile, RuntimeError) as e:
+            messages.append(f"Error processing {file_name}: {str(e)}")
+            success = False
+        outputs[file_name] = sorted(list_outputs(student_folder) - before)
+        if not success:
+            messages.append(f"Failed to process {file_name}")
+            failures.append(file_name)
+    return messages, failures, outputs
+
+def load_manifest(target_directory):
+    try:
+        with open(os.path.join(target_directory, MANIFEST_FILE), encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+def save_manifest(target_directory, manifest):
+    path = os.path.join(target_directory, MANIFEST_FILE)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(temp_path, path)
+
+def describe_source(file_path, previous):
+    """Size, mtime and hash of a source file; the hash is reused while size and mtime match."""
+    stat = os.stat(file_path)
+    if previous and previous.get("size") == stat.st_size and previous.get("mtime_ns") == stat.st_mtime_ns:
+        sha256 = previous["sha256"]
+    else:
+        sha256 = hash_file(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": sha256}
+
+def student_is_current(student_folder, sources, entry):
+    """Whether a student's folder was built from exactly these sources."""
+    if not entry or not os.path.isdir(student_folder):
+        return False
+    previous = entry.get("sources", {})
+    if set(previous) != set(sources):
+        return False
+    return all(previous[name]["sha256"] == source["sha256"] for name, source in sources.items())
+
+def extract_all(directory, target_directory, limits, jobs=1, rebuild=False, log=print):
+    """Bring target_directory up to date with the submissions in directory.
+
+    Yields a StudentExtraction for every student, in login order, as soon as
+    their folder is ready, so callers can start on a student while later ones
+    are still being extracted. Students whose submissions are unchanged since
+    the last run are yielded straight away. The manifest is saved once the
+    generator finishes or is closed.
+    """
+    # Without a usable manifest there's no telling what the target holds, so start over;
+    # likewise if the limits changed, since they decide what every folder contains
+    manifest = None if rebuild else load_manifest(target_directory)
+    if manifest is None or manifest.get("limits") != asdict(limits):
+        if os.path.exists(target_directory):
+            log(f"Clearing target directory: {target_directory}")
+            shutil.rmtree(target_directory)
+        manifest = {"version": MANIFEST_VERSION, "limits": asdict(limits), "students": {}}
+    
+    # Create necessary directories
+    os.makedirs(target_directory, exist_ok=True)
+    
+    # Group the files in the submissions directory by student, so two files
+    # from the same student are never extracted into one folder concurrently
+    files_by_student = {}
+    for file_path in sorted(scan_dir(directory).files):
+        # Get student login (first part before underscore)
+        student_login = os.path.basename(file_path).split("_")[0]
+        files_by_student.setdefault(student_login, []).append(file_path)
+    
+    # Prune the folders of students who no longer have any submissions
+    students = manifest["students"]
+    for student_login in sorted(set(students) - set(files_by_student)):
+        log(f"Removing {student_login}: submissions no longer present")
+        shutil.rmtree(os.path.join(target_directory, student_login), ignore_errors=True)
+        del students[student_login]
+    
+    # A student is rebuilt whenever any of their files was added, changed or removed
+    sources_by_student = {}
+    stale_students = []
+    for student_login, file_paths in sorted(files_by_student.items()):
+        previous = students.get(student_login, {}).get("sources", {})
+        sources = {os.path.basename(path): describe_source(path, previous.get(os.path.basename(path)))
+                   for path in file_paths}
+        sources_by_student[student_login] = sources
+        if student_is_current(os.path.join(target_directory, student_login), sources, students.get(student_login)):
+            # Keep the manifest's size and mtime fresh so the files aren't hashed again
+            for name, source in sources.items():
+                students[student_login]["sources"][name].update(source)
+        else:
+            stale_students.append(student_login)
+    
+    def extract(student_login):
+        student_folder = os.path.join(target_directory, student_login)
+        return process_student(student_folder, files_by_student[student_login], limits)
+    
+    # Students come out in login order, whatever order the workers finish in
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, jobs)) as pool:
+            extracted = iter(pool.map(extract, stale_students))
+            stale_set = set(stale_students)
+            for student_login in sorted(files_by_student):
+                student_folder = os.path.join(target_directory, student_login)
+                if student_login not in stale_set:
+                    yield StudentExtraction(student_login, student_folder, [],
+                                            students[student_login].get("failures", []), False)
+                    continue
+                messages, failures, outputs = next(extracted)
+                sources = sources_by_student[student_login]
+                for name, source in sources.items():
+                    source["outputs"] = outputs.get(name, [])
+                students[student_login] = {"sources": sources, "failures": failures}
+                yield StudentExtraction(student_login, student_folder, messages, failures, True)
+    finally:
+        save_manifest(target_directory, manifest)
+
 def main():
     args = parse_args()
     
     # Use command line arguments instead of hardcoded paths
     directory = args.submissions_dir
     target_directory = args.target_dir
-    temp_directory = "./temp_processing"
     
     # Validate directories
     if not os.path.exists(directory):
         print(f"Error: Submissions directory '{directory}' does not exist")
         return
     
-    # Clear target directory if it exists
-    if os.path.exists(target_directory):
-        print(f"Clearing target directory: {target_directory}")
-        shutil.rmtree(target_directory)
-    
-    # Create necessary directories
-    os.makedirs(target_directory, exist_ok=True)
-    os.makedirs(temp_directory, exist_ok=True)
-    
-    # Process each file in the submissions directory
-    for file_name in os.listdir(directory):
-        if file_name.startswith('.'):
-            continue
-            
-        file_path = os.path.join(directory, file_name)
-        if not os.path.isfile(file_path):
-            continue
-            
-        # Get student login (first part before underscore)
-        student_login = file_name.split("_")[0]
-        student_folder = os.path.join(target_directory, student_login)
-        
-        success = process_submission(file_path, student_folder, temp_directory)
-        if not success:
-            print(f"Failed to process {file_name}")
+    total_files = len(scan_dir(directory).files)
+    extracted_students = 0
+    failed_files = []
+    student_count = 0
+    for extraction in extract_all(directory, target_directory, limits_from_args(args), args.jobs, args.rebuild):
+        for message in extraction.messages:
+            print(message)
+        student_count += 1
+        extracted_students += extraction.extracted
+        failed_files.extend(extraction.failures)
     
-    # Clean up temporary directory
-    shutil.rmtree(temp_directory, ignore_errors=True)
-    print("Processing complete. Temporary files cleaned up.")
+    print(f"Extracted {extracted_students} of {student_count} students; the rest were unchanged.")
+    if failed_files:
+        print(f"\n{len(failed_files)} of {total_files} submissions failed:")
+        for file_name in failed_files:
+            print(f"  - {file_name}")
+    print("Processing complete.")
 
 if __name__ == "__main__":
     main()
@@ -3,103 +3,103 @@ import webbrowser
 from bs4 import BeautifulSoup
 import cssutils
 import re
-import requests
+import argparse
 import sys
 
-# Path to the directory containing student folders
-directory = "./processed_submissions"
-
-def validate_html_file(file_path):
-    with open(file_path, 'r', encoding='utf-8') as f:
-        html_content = f.read()
-    
-    headers = {
-        'Content-Type': 'text/html; charset=utf-8'
-    }
-
-    params = {
-        'out': 'json'  # Use JSON output for easy parsing
-    }
-
-    response = requests.post(
-        'https://validator.nu?out=json',
-        headers=headers,
-        data=html_content.encode('utf-8'),
-        allow_redirects=False
-    )
-
-    print(response.status_code)
-    if response.status_code != 200:
-        print(f"Validator error: {response.status_code}")
-        return
-
-    print(response.text)
-    
-    results = response.json()
-
-    messages = results.get('messages', [])
-    if not messages:
-        feedback = "✅ No issues found. HTML is valid."
-    else:
-        feedback = "⚠️ Issues found:"
-        for msg in messages:
-            line = msg.get('lastLine', '?')
-            msg_text = msg.get('message', '')
-            msg_type = msg.get('type', 'info')
-            feedback += f"\n[{msg_type.upper()}] Line {line}: {msg_text}"
-    return feedback
-
-# Main script
-final_scores = {}
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.html_validation import (BasicValidator, RemoteValidator, VnuJarValidator,
+                                    REMOTE_VALIDATOR_URL, REMOTE_CONCURRENCY, REMOTE_TIMEOUT,
+                                    format_feedback, validate_files)
+from common.result_cache import ResultCache
+from common.scan import scan_dir
 
-start_name = ""
-if len(sys.argv) > 1:
-    start_name = sys.argv[1]
-    
-for folder_name in sorted(os.listdir(directory)):
-    if start_name:
-        if folder_name < start_name:
-            continue
-    folder_path = os.path.join(directory, folder_name)
-
-    if not os.path.isdir(folder_path):
-        continue
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+VALIDATION_CACHE_DIR = os.path.join(LAB_DIR, ".validation_cache")
 
-    print(f"\nAnalyzing folder: {folder_name}")
+# Path to the directory containing student folders
+directory = "./processed_submissions"
 
-    # Locate HTML and CSS files
+def make_validator(args):
+    """Pick the validator backend; 'auto' prefers a local vnu.jar and falls back to the basic checks."""
+    if args.validator == "remote":
+        return RemoteValidator(args.validator_url, concurrency=args.concurrency, timeout=args.timeout)
+    jar = VnuJarValidator.find_jar(args.vnu_jar)
+    if args.validator == "vnu" and not jar:
+        sys.exit("vnu.jar not found: pass --vnu-jar or set VNU_JAR, and make sure java is on PATH.")
+    if jar and args.validator in ("vnu", "auto"):
+        return VnuJarValidator(jar)
+    return BasicValidator()
+
+def find_submission_files(folder_path):
+    """Return the folder's (html_file, css_file), the last of each found, as before."""
     html_file = None
     css_file = None
+    for file_path in scan_dir(folder_path, include_hidden=True).files:
+        if file_path.endswith(".html"):
+            html_file = file_path
+        elif file_path.endswith(".css"):
+            css_file = file_path
+    return html_file, css_file
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate and review lab 1 submissions')
+    parser.add_argument('start_name', nargs='?', default="", help='Student login to start reviewing from')
+    parser.add_argument('--validator', choices=['auto', 'basic', 'vnu', 'remote'], default='auto',
+                        help='HTML validator backend (default: vnu.jar if available, else the basic checks)')
+    parser.add_argument('--vnu-jar', default=None, help='Path to vnu.jar (default: $VNU_JAR)')
+    parser.add_argument('--validator-url', default=REMOTE_VALIDATOR_URL,
+                        help='Validator service used by --validator remote, e.g. a self-hosted or stand-in server')
+    parser.add_argument('--concurrency', type=int, default=REMOTE_CONCURRENCY,
+                        help='Maximum validator requests in flight with --validator remote')
+    parser.add_argument('--timeout', type=float, default=REMOTE_TIMEOUT,
+                        help='Seconds to wait for each validator request')
+    parser.add_argument('--no-cache', action='store_true', help='Revalidate files instead of reusing cached results')
+    args = parser.parse_args()
+
+    start_name = args.start_name
+    folders = []
+    for folder_path in sorted(scan_dir(directory, include_hidden=True).dirs):
+        folder_name = os.path.basename(folder_path)
+        if start_name:
+            if folder_name < start_name:
+                continue
+        folders.append((folder_name, folder_path) + find_submission_files(folder_path))
+
+    # Validate the whole class in one batch before the review starts
+    validator = make_validator(args)
+    print(f"Validating {len(folders)} submissions with {validator.name}...")
+    validations = validate_files([html_file for _, _, html_file, _ in folders if html_file], validator,
+                                 ResultCache(VALIDATION_CACHE_DIR, enabled=not args.no_cache))
+
+    for folder_name, folder_path, html_file, css_file in folders:
+        print(f"\nAnalyzing folder: {folder_name}")
+
+        if not html_file:
+            print("No HTML file found.")
+            continue
 
-    for file_name in os.listdir(folder_path):
-        if file_name.endswith(".html"):
-            html_file = os.path.join(folder_path, file_name)
-        elif file_name.endswith(".css"):
-            css_file = os.path.join(folder_path, file_name)
-
-    if not html_file:
-        print("No HTML file found.")
-        continue
-
-    # Analyze HTML file
-    print(os.path.abspath(html_file))
-    html_feedback = validate_html_file(os.path.abspath(html_file))
-    print("HTML Feedback:")
-    print(html_feedback)
-
-    # Open the HTML file in the browser
-    absolute_html_path = os.path.abspath(html_file)
-    webbrowser.open(f"file://{absolute_html_path}")
-    
-    # final feedback
-    print(f'---------------{folder_name}-----------------')
-    # for category in categories: 
-    #     print(f'{category}: {grade_by_cat[category]} / 4')
-    #     if category in comment_by_cat and comment_by_cat[category]:
-    #         print(f'Comment: {comment_by_cat[category]}')
-    # print(f"Final grade: {final_grade} / 28")    
-    # Wait for user input
-    print(f'---------------------------------------------')
-    input("\nPress Enter to analyze the next folder...")
-
-print("Analysis complete.")
+        # Analyze HTML file
+        print(os.path.abspath(html_file))
+        html_feedback = format_feedback(validations[html_file])
+        print("HTML Feedback:")
+        print(html_feedback)
+
+        # Open the HTML file in the browser
+        absolute_html_path = os.path.abspath(html_file)
+        webbrowser.open(f"file://{absolute_html_path}")
+
+        # final feedback
+        print(f'---------------{folder_name}-----------------')
+        # for category in categories:
+        #     print(f'{category}: {grade_by_cat[category]} / 4')
+        #     if category in comment_by_cat and comment_by_cat[category]:
+        #         print(f'Comment: {comment_by_cat[category]}')
+        # print(f"Final grade: {final_grade} / 28")
+        # Wait for user input
+        print(f'---------------------------------------------')
+        input("\nPress Enter to analyze the next folder...")
+
+    print("Analysis complete.")
+
+if __name__ == "__main__":
+    main()
@@ -1,93 +1,55 @@
 import os
-import glob
-import shutil
-import webbrowser
-import argparse
-import bisect
+import sys
 
-def find_file_by_extension(directory: str, extension: str) -> str:
-    """Find the first file with the given extension in the directory."""
-    files = glob.glob(os.path.join(directory, f"*.{extension}"))
-    return files[0] if files else None
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.lab_engine import LabManifest, run_lab
 
-def setup_and_run_submission(submission_path: str, template_dir: str) -> None:
-    """Copy template files and run the submission with student's JS."""
-    
-    # Find student's JS file
-    js_file = find_file_by_extension(submission_path, "js")
-    if not js_file:
-        print(f"No JavaScript file found in {submission_path}")
-        return
-    
-    # Create a temporary directory in current directory
-    temp_dir = os.path.join(".", "temp_run")
-    os.makedirs(temp_dir, exist_ok=True)
-    
-    try:
-        # Clean up any existing files in temp_dir
-        for file in os.listdir(temp_dir):
-            os.remove(os.path.join(temp_dir, file))
-            
-        # Copy template files
-        for template_file in ["magic-8-ball.html", "styles.css"]:
-            shutil.copy2(
-                os.path.join(template_dir, template_file),
-                os.path.join(temp_dir, template_file)
-            )
-        
-        # Copy student's JS file with original name
-        js_filename = os.path.basename(js_file)
-        shutil.copy2(js_file, os.path.join(temp_dir, 'magic-8-ball.js'))
-        if js_filename != 'magic-8-ball.js':
-            print(f"Expected 'magic-8-ball.js' but found '{js_filename}\nMake sure to name your JS file 'magic-8-ball.js', otherwise it doesn't connect to the HTML file : -0.5 pts.")
-        else:
-            print("JS FILE NAMED CORRECTLY")
-        
-        # Open the HTML file in browser
-        html_path = os.path.join(temp_dir, "magic-8-ball.html")
-        print(f"\nOpening {html_path} in browser...")
-        webbrowser.open(f"file://{os.path.abspath(html_path)}")
-        
-    except Exception as e:
-        print(f"Error setting up submission: {str(e)}")
+# Scripted checks of the page's behavior, run headlessly for every student (see common/dom_harness.py)
+BEHAVIORS = [
+    {"name": "Shaking shows an answer", "steps": [
+        {"input": ["#question", "Will it rain tomorrow?"]},
+        {"click": "#shake-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#answer", "text_not": "8"}},
+    ]},
+    {"name": "The question is displayed", "steps": [
+        {"input": ["#question", "Will it rain tomorrow?"]},
+        {"click": "#shake-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#question-display", "matches": "Will it rain tomorrow"}},
+    ]},
+    {"name": "The question is added to the history", "steps": [
+        {"input": ["#question", "Will it rain tomorrow?"]},
+        {"click": "#shake-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#question-history li", "min_count": 1}},
+    ]},
+    {"name": "Reset restores the ball", "steps": [
+        {"input": ["#question", "Will it rain tomorrow?"]},
+        {"click": "#shake-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#answer", "text_not": "8"}},
+        {"click": "#reset-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#answer", "text": "8"}},
+    ]},
+    {"name": "Clear History empties the list", "steps": [
+        {"input": ["#question", "Will it rain tomorrow?"]},
+        {"click": "#shake-button"},
+        {"advance": 3000},
+        {"expect": {"selector": "#question-history li", "min_count": 1}},
+        {"click": "#clear-history-button"},
+        {"expect": {"selector": "#question-history li", "count": 0}},
+    ]},
+]
 
-def main():
-    # Set up argument parser
-    parser = argparse.ArgumentParser(description='Run student submissions')
-    parser.add_argument('--student', type=str, help='Student login to start from', default=None)
-    args = parser.parse_args()
-
-    submissions_dir = "./processed_submissions"
-    template_dir = "./website_template"
-    
-    # Get list of student directories and sort alphabetically
-    student_dirs = sorted([d for d in os.listdir(submissions_dir) 
-                         if os.path.isdir(os.path.join(submissions_dir, d))])
-    
-    # Find starting index based on provided student login
-    start_index = 0
-    if args.student:
-        start_index = bisect.bisect_left(student_dirs, args.student)
-        if start_index == len(student_dirs) or student_dirs[start_index] != args.student:
-            print(f"Student {args.student} not found. Starting with next student alphabetically.")
-        if start_index == len(student_dirs):
-            start_index = 0
-            print("Wrapping around to the beginning of the list.")
-    
-    # Reorder the list to start from the selected student
-    student_dirs = student_dirs[start_index:] + student_dirs[:start_index]
-    
-    for student_dir in student_dirs:
-        print("\n" + "=" * 60)
-        print(f"Student: {student_dir}")
-        print("=" * 60)
-        
-        submission_path = os.path.join(submissions_dir, student_dir)
-        setup_and_run_submission(submission_path, template_dir)
-        
-        print("\nPress Enter to continue to next submission (or 'q' to quit)...")
-        if input().lower() == 'q':
-            break
+LAB = LabManifest(
+    html_file="magic-8-ball.html",
+    css_file="styles.css",
+    expected_js_file="magic-8-ball.js",
+    behaviors=BEHAVIORS,
+    misnamed_js_penalty=" : -0.5 pts."
+)
 
 if __name__ == "__main__":
-    main()
+    run_lab(LAB)
@@ -0,0 +1,110 @@
+import os
+import sys
+import argparse
+import functools
+import importlib
+import threading
+
+from common.batch import grade_in_batch
+from common.journal import ResultsJournal, journal_path
+from extract_submissions import add_limit_arguments, limits_from_args, extract_all
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+# Projects whose checker can grade in batch, and the grader class each one defines
+GRADERS = {
+    "project1": "Project1Grader",
+    "project2": "Project2Grader",
+}
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Extract student submissions and grade each one as soon as it is ready.')
+    parser.add_argument('submissions_dir', help='Directory containing the student submissions')
+    parser.add_argument('project', choices=sorted(GRADERS), help='Project to grade the submissions for')
+    parser.add_argument('--target-dir', default=None,
+                        help="Where processed submissions are stored (default: the project's processed_submissions)")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of grader processes')
+    parser.add_argument('--extract-jobs', type=int, default=1, help='Number of students to extract concurrently')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore the manifest and re-extract every submission')
+    parser.add_argument('--no-cache', action='store_true', help='Regrade every rubric item instead of reusing cached results')
+    parser.add_argument('--fresh', action='store_true', help="Discard an unfinished run's results journal and grade everyone again")
+    add_limit_arguments(parser)
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+
+    directory = os.path.abspath(args.submissions_dir)
+    project_dir = os.path.join(REPO_ROOT, args.project)
+    target_directory = os.path.abspath(args.target_dir or os.path.join(project_dir, "processed_submissions"))
+
+    if not os.path.exists(directory):
+        print(f"Error: Submissions directory '{directory}' does not exist")
+        return
+
+    # The checkers resolve their templates relative to the working directory
+    os.chdir(project_dir)
+    sys.path.insert(0, project_dir)
+    checker = importlib.import_module("checker")
+    grader_factory = functools.partial(getattr(checker, GRADERS[args.project]), use_cache=not args.no_cache)
+
+    # Results are journaled as they come in and compacted into grading_results.json at the end
+    journal = ResultsJournal(journal_path(checker.RESULTS_FILE), fresh=args.fresh)
+    # Pick up where an unfinished run (interrupted or crashed) left off
+    already_graded = journal.graded_students()
+    if already_graded:
+        print(f"Resuming: {len(already_graded)} students already graded in {journal.path} (use --fresh to start over)")
+
+    # Extraction messages come from the feeding thread, so keep whole blocks together
+    output_lock = threading.Lock()
+
+    def log(message):
+        with output_lock:
+            print(message)
+
+    failed_files = []
+
+    def extracted_submissions():
+        for extraction in extract_all(directory, target_directory, limits_from_args(args),
+                                      args.extract_jobs, args.rebuild, log=log):
+            with output_lock:
+                for message in extraction.messages:
+                    print(message)
+            failed_files.extend(extraction.failures)
+            if extraction.login not in already_graded:
+                yield extraction.login, extraction.folder
+
+    finished = False
+    try:
+        for student_dir, result, output in grade_in_batch(grader_factory, extracted_submissions(), args.jobs):
+            journal.append(student_dir, result)
+            with output_lock:
+                # Show each student's grader output as one block so workers don't interleave
+                checker.print_submission_summary(student_dir, result)
+                if output.strip():
+                    print("\nGrader output:")
+                    print(output.rstrip())
+        finished = True
+    finally:
+        # Whatever was graded reaches grading_results.json, even after an interruption
+        journal.compact(checker.RESULTS_FILE)
+
+    # Print final summary
+    print("\nFinal Grading Summary:")
+    print("=" * 60)
+    for student, result in journal.results():
+        print(f"\nStudent: {student}")
+        if "error" in result:
+            print(f"Error: {result['error']}")
+        print(f"Total Score: {result['total']['points']}/{result['total']['max_points']}")
+        print(f"Percentage: {result['total']['percentage']:.2f}%")
+
+    if failed_files:
+        print(f"\n{len(failed_files)} submissions could not be extracted:")
+        for file_name in failed_files:
+            print(f"  - {file_name}")
+
+    # A finished run starts the next one from scratch; an unfinished one is resumed
+    journal.close(remove=finished)
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,167 @@
 import os
-import re
 from bs4 import BeautifulSoup
-import json
-from typing import Dict, List, Callable, Any, Optional
-from dataclasses import dataclass
+from typing import Dict, List, Callable, Any, Optional, Set
+from dataclasses import dataclass, asdict
 from abc import ABC, abstractmethod
-import glob
 import argparse
 import bisect
+import functools
+import sys
 
-def find_file_by_extension(directory: str, extension: str) -> Optional[str]:
-    """Find the first file with the given extension in the directory."""
-    files = glob.glob(os.path.join(directory, f"*.{extension}"))
-    return files[0] if files else None
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_CACHE_DIR = os.path.join(PROJECT_DIR, ".grading_cache")
+RESULTS_FILE = "grading_results.json"
+
+sys.path.insert(0, os.path.join(PROJECT_DIR, ".."))
+from common.batch import grade_in_batch, grade_in_order
+from common.js_index import JS_INDEX_SCRIPT, JSIndex, index_source, index_sources
+from common.result_cache import ResultCache, hash_files, hash_sources, rubric_item_fingerprint
+from common.journal import ResultsJournal, journal_path
+from common.scan import scan_dir, list_subdirectories
+
+class LinePattern:
+    """A regex made only of literals joined by `.*`, with `|` between alternatives.
+
+    It matches exactly where re.search would, since `.` never crosses a newline,
+    but each line is matched by finding every literal left to right with
+    str.find. That is linear in the line length, where the backtracking regex
+    engine can take polynomial time on one long (minified or pasted) line.
+    """
+    METACHARACTERS = set("^$*+?{}[]()|.")
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.alternatives = [self._compile(alternative) for alternative in pattern.split("|")]
+
+    def _compile(self, alternative: str) -> List[str]:
+        literals = []
+        for part in alternative.split(".*"):
+            literal = []
+            i = 0
+            while i < len(part):
+                if part[i] == "\\" and i + 1 < len(part) and part[i + 1] in self.METACHARACTERS | {"\\"}:
+                    literal.append(part[i + 1])
+                    i += 2
+                elif part[i] in self.METACHARACTERS or part[i] == "\\":
+                    raise ValueError(f"Unsupported construct in rubric pattern {self.pattern!r}: use re instead")
+                else:
+                    literal.append(part[i])
+                    i += 1
+            if literal:
+                literals.append("".join(literal))
+        return literals
+
+    def search_line(self, line: str) -> bool:
+        for literals in self.alternatives:
+            position = 0
+            for literal in literals:
+                position = line.find(literal, position)
+                if position < 0:
+                    break
+                position += len(literal)
+            else:
+                return True
+        return False
+
+class PatternSet:
+    """Named LinePatterns, compiled once and evaluated together in one pass over a file."""
+    def __init__(self, patterns: Dict[str, str]):
+        self.patterns = {name: LinePattern(pattern) for name, pattern in patterns.items()}
+
+    def scan(self, text: str) -> Set[str]:
+        """Return the names of the patterns that match somewhere in text."""
+        matched: Set[str] = set()
+        pending = dict(self.patterns)
+        for line in text.split("\n"):
+            for name, pattern in list(pending.items()):
+                if pattern.search_line(line):
+                    matched.add(name)
+                    del pending[name]
+            if not pending:
+                break
+        return matched
+
+# Every regex check made by the rubric items, compiled at import
+RUBRIC_PATTERNS = PatternSet({
+    "conversion_type_retrieval": r'document\.getElementById.*conversion.*\.value',
+    "formula_retrieval": r'document\.getElementById.*formula',
+    "temperature_retrieval": r'document\.getElementById.*temperature.*\.value',
+    "number_parsing": r'parseFloat|parseInt|Number',
+    "f_to_c_formula": r'\(.*32.*\).*5.*9',
+    "c_to_f_formula": r'.*9.*5.*32',
+    "decimal_formatting": r'toFixed.*2',
+    "input_clearing": r'\.value.*=.*""',
+    "formula_reset": r'conversion.*textContent.*=',
+    "assessment_reset": r'assessment.*textContent.*=',
+})
+
+class SubmissionContext:
+    """One student's submission, scanned once and shared by every rubric item.
+
+    The directory is listed once with scan_dir and its files bucketed by
+    extension; file contents and the parsed HTML are loaded on first use and
+    memoized.
+    """
+    def __init__(self, submission_path: str):
+        self.path = submission_path
+        # Hidden files (e.g. macOS "._" resource forks) are skipped, as glob does
+        self.files_by_extension: Dict[str, List[str]] = scan_dir(submission_path).files_by_extension()
+        self._contents: Dict[str, str] = {}
+        self._soup: Optional[BeautifulSoup] = None
+        self._js_index: Optional[JSIndex] = None
+        self._js_matches: Optional[Set[str]] = None
+        self._fingerprint: Optional[str] = None
+
+    def find_file(self, extension: str) -> Optional[str]:
+        """Return the first file with the given extension, if any."""
+        files = self.files_by_extension.get(extension)
+        return files[0] if files else None
+
+    @property
+    def fingerprint(self) -> str:
+        """Digest of every file in the submission, for keying cached results."""
+        if self._fingerprint is None:
+            self._fingerprint = hash_files(path for files in self.files_by_extension.values() for path in files)
+        return self._fingerprint
+
+    def read(self, path: str) -> str:
+        if path not in self._contents:
+            with open(path, "r") as f:
+                self._contents[path] = f.read()
+        return self._contents[path]
+
+    @property
+    def html_file(self) -> Optional[str]:
+        return self.find_file("html")
+
+    @property
+    def js_file(self) -> Optional[str]:
+        return self.find_file("js")
+
+    @property
+    def js_content(self) -> Optional[str]:
+        """The student's JavaScript source, or None if there is no JS file."""
+        return self.read(self.js_file) if self.js_file else None
+
+    @property
+    def js_index(self) -> Optional[JSIndex]:
+        """The parsed view of the student's JavaScript, or None if there is no JS file."""
+        if self._js_index is None and self.js_content is not None:
+            self._js_index = index_source(self.js_content)
+        return self._js_index
+
+    def js_matches(self, pattern_name: str) -> bool:
+        """Whether the named RUBRIC_PATTERNS entry matches the student's JavaScript, ignoring comments."""
+        if self._js_matches is None:
+            self._js_matches = RUBRIC_PATTERNS.scan(self.js_index.source if self.js_index else "")
+        return pattern_name in self._js_matches
+
+    @property
+    def soup(self) -> Optional[BeautifulSoup]:
+        """The parsed HTML file, or None if there is no HTML file."""
+        if self._soup is None and self.html_file:
+            self._soup = BeautifulSoup(self.read(self.html_file), 'html.parser')
+        return self._soup
 
 @dataclass
 class GradingResult:
@@ -21,26 +170,26 @@ class GradingResult:
     max_points: float
 
 class RubricItem(ABC):
+    # Bump to invalidate cached results when grading changes outside the item's own class
+    version = 1
+    
     def __init__(self, name: str, max_points: float):
         self.name = name
         self.max_points = max_points
     
     @abstractmethod
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         pass
 
 class HTMLModificationsGrader(RubricItem):
     def __init__(self):
         super().__init__("HTML Modifications", 2.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         # try:
-        #     html_file = find_file_by_extension(submission_path, "html")
-        #     if not html_file:
+        #     soup = context.soup
+        #     if soup is None:
         #         return GradingResult(0, ["No HTML file found in submission"], self.max_points)
-            
-        #     with open(html_file, "r") as f:
-        #         soup = BeautifulSoup(f.read(), 'html.parser')
                 
         #     temp_div = soup.find('div', id='temperatureAssessment')
             
@@ -60,34 +209,32 @@ class UpdateFormulaGrader(RubricItem):
     def __init__(self):
         super().__init__("updateFormula() Function", 3.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         try:
-            js_file = find_file_by_extension(submission_path, "js")
-            if not js_file:
+            js_index = context.js_index
+            if js_index is None:
                 return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
             
-            with open(js_file, "r") as f:
-                js_content = f.read()
-            
             # Check if function exists
-            if 'function updateFormula' not in js_content:
+            if not js_index.declares('updateFormula'):
                 return GradingResult(0, ["Function not implemented"], self.max_points)
             
             points = 3
             comments = []
             
             # Check for getting conversion type
-            if not re.search(r'document\.getElementById.*conversion.*\.value', js_content):
+            if not context.js_matches("conversion_type_retrieval"):
                 points -= 1
                 comments.append("Missing conversion type retrieval")
             
             # Check for formula element
-            if not re.search(r'document\.getElementById.*formula', js_content):
+            if not context.js_matches("formula_retrieval"):
                 points -= 1
                 comments.append("Missing formula element retrieval")
             
             # Check for conditional logic
-            if not ('if' in js_content and ('ftoc' in js_content or 'ctof' in js_content)):
+            source = js_index.source
+            if not ('if' in source and ('ftoc' in source or 'ctof' in source)):
                 points -= 1
                 comments.append("Missing conversion type checking")
             
@@ -103,16 +250,13 @@ class AssessTemperatureGrader(RubricItem):
     def __init__(self):
         super().__init__("Fahrenheit Assessment", 4.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         try:
-            js_file = find_file_by_extension(submission_path, "js")
-            if not js_file:
+            js_index = context.js_index
+            if js_index is None:
                 return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
             
-            with open(js_file, "r") as f:
-                js_content = f.read()
-            
-            if 'function assessTemperature' not in js_content:
+            if not js_index.declares('assessTemperature'):
                 return GradingResult(0, ["Function not implemented"], self.max_points)
             
             points = 4
@@ -133,11 +277,11 @@ class AssessTemperatureGrader(RubricItem):
                 temp_missing = False
                 color_missing = False
                 
-                if str(temp) not in js_content:
+                if not js_index.has_number(temp):
                     temp_missing = True
                     missing_count += 1
                     comments.append(f"Missing {desc} temperature range")
-                if color.lower() not in js_content.lower():
+                if not js_index.has_string_containing(color):
                     color_missing = True
                     missing_count += 1
                     comments.append(f"Missing {color} color assignment")
@@ -158,28 +302,25 @@ class InputHandlingGrader(RubricItem):
     def __init__(self):
         super().__init__("Input Handling", 3.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         try:
-            js_file = find_file_by_extension(submission_path, "js")
-            if not js_file:
+            js_index = context.js_index
+            if js_index is None:
                 return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
             
-            with open(js_file, "r") as f:
-                js_content = f.read()
-            
-            if 'function convertTemperature' not in js_content:
+            if not js_index.declares('convertTemperature'):
                 return GradingResult(0, ["Function not implemented"], self.max_points)
             
             points = 3
             comments = []
             
             # Check for input retrieval
-            if not re.search(r'document\.getElementById.*temperature.*\.value', js_content):
+            if not context.js_matches("temperature_retrieval"):
                 points -= 1
                 comments.append("Missing temperature input retrieval")
             
             # Check for parsing
-            if not re.search(r'parseFloat|parseInt|Number', js_content):
+            if not context.js_matches("number_parsing"):
                 points -= 2
                 comments.append("Missing proper number parsing")
             
@@ -195,38 +336,35 @@ class ConversionLogicGrader(RubricItem):
     def __init__(self):
         super().__init__("Conversion Logic", 5.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         try:
-            js_file = find_file_by_extension(submission_path, "js")
-            if not js_file:
+            js_index = context.js_index
+            if js_index is None:
                 return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
             
-            with open(js_file, "r") as f:
-                js_content = f.read()
-            
-            if 'function convertTemperature' not in js_content:
+            if not js_index.declares('convertTemperature'):
                 return GradingResult(0, ["Function not implemented"], self.max_points)
             
             points = 5
             comments = []
             
             # Check for Fahrenheit to Celsius formula
-            if not re.search(r'\(.*32.*\).*5.*9', js_content):
+            if not context.js_matches("f_to_c_formula"):
                 points -= 1
                 comments.append("Missing or incorrect F to C formula")
             
             # Check for Celsius to Fahrenheit formula
-            if not re.search(r'.*9.*5.*32', js_content):
+            if not context.js_matches("c_to_f_formula"):
                 points -= 1
                 comments.append("Missing or incorrect C to F formula")
             
             # Check for decimal places formatting
-            if not re.search(r'toFixed.*2', js_content):
+            if not context.js_matches("decimal_formatting"):
                 points -= 1
                 comments.append("Missing proper decimal formatting")
             
             # Check for assessment function call
-            if not re.search(r'assessTemperature.*\(', js_content):
+            if not js_index.calls_function('assessTemperature'):
                 points -= 2
                 comments.append("Missing assessment function call")
             
@@ -242,16 +380,13 @@ class ClearConverterGrader(RubricItem):
     def __init__(self):
         super().__init__("Clear Converter", 3.0)
     
-    def grade(self, submission_path: str) -> GradingResult:
+    def grade(self, context: SubmissionContext) -> GradingResult:
         try:
-            js_file = find_file_by_extension(submission_path, "js")
-            if not js_file:
+            js_index = context.js_index
+            if js_index is None:
                 return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
             
-            with open(js_file, "r") as f:
-                js_content = f.read()
-            
-            if 'function clearConverter' not in js_content:
+            if not js_index.declares('clearConverter'):
                 return GradingResult(0, ["Function not implemented"], self.max_points)
             
             points = 3
@@ -259,17 +394,17 @@ class ClearConverterGrader(RubricItem):
             missing_count = 0
             
             # Check for form reset
-            if not re.search(r'\.value.*=.*""', js_content):
+            if not context.js_matches("input_clearing"):
                 missing_count += 1
                 comments.append("Missing input field clearing")
             
             # Check for formula reset
-            if not re.search(r'conversion.*textContent.*=', js_content):
+            if not context.js_matches("formula_reset"):
                 missing_count += 1
                 comments.append("Missing formula display reset")
             
             # Check for assessment reset
-            if not re.search(r'assessment.*textContent.*=', js_content):
+            if not context.js_matches("assessment_reset"):
                 missing_count += 1
                 comments.append("Missing assessment display reset")
             
@@ -286,7 +421,13 @@ class ClearConverterGrader(RubricItem):
             return GradingResult(0, [f"Error checking clearConverter: {str(e)}"], self.max_points)
 
 class Project1Grader:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        self.result_cache = ResultCache(RESULT_CACHE_DIR, enabled=use_cache)
+        # The shared helpers every item relies on: the rubric patterns, the submission context and the JS indexer
+        patterns = "\n".join(f"{name}: {pattern.pattern}" for name, pattern in RUBRIC_PATTERNS.patterns.items())
+        self.engine = ResultCache.key(
+            hash_sources(LinePattern, PatternSet, SubmissionContext), patterns,
+            hash_files([JS_INDEX_SCRIPT, os.path.join(os.path.dirname(JS_INDEX_SCRIPT), "js_index.py")]))
         self.rubric_items = [
             HTMLModificationsGrader(),
             UpdateFormulaGrader(),
@@ -297,13 +438,32 @@ class Project1Grader:
         ]
     
     def grade_submission(self, submission_path: str) -> Dict[str, Any]:
+        return self.grade_context(SubmissionContext(submission_path))
+    
+    def grade_item(self, item: RubricItem, context: SubmissionContext) -> GradingResult:
+        """Grade one rubric item, reusing the cached result if neither it nor the submission changed."""
+        # Results from the text fallback must not stand in for real AST-based ones
+        try:
+            parse_mode = "ast" if context.js_index is not None and context.js_index.parsed else "text"
+        except (OSError, ValueError):
+            # An unreadable JS file is reported by each item as it grades; those results aren't cached
+            return item.grade(context)
+        key = self.result_cache.key(context.fingerprint, parse_mode, rubric_item_fingerprint(item, self.engine))
+        cached = self.result_cache.get(key)
+        if cached is not None:
+            return GradingResult(**cached)
+        result = item.grade(context)
+        self.result_cache.put(key, asdict(result))
+        return result
+    
+    def grade_context(self, context: SubmissionContext) -> Dict[str, Any]:
         results = {}
         total_points = 0
         total_possible = 0
         
         # First check if required files exist
-        html_file = find_file_by_extension(submission_path, "html")
-        js_file = find_file_by_extension(submission_path, "js")
+        html_file = context.html_file
+        js_file = context.js_file
         
         if not html_file or not js_file:
             missing_files = []
@@ -322,7 +482,7 @@ class Project1Grader:
             }
         
         for item in self.rubric_items:
-            result = item.grade(submission_path)
+            result = self.grade_item(item, context)
             results[item.name] = {
                 "points": result.points,
                 "max_points": result.max_points,
@@ -365,18 +525,70 @@ def print_submission_summary(student: str, result: Dict[str, Any]) -> None:
     print("\nTotal Results:")
     print(f"Total Score: {result['total']['points']}/{result['total']['max_points']}")
 
+def readable_js_sources(submission_paths: List[str]) -> List[str]:
+    """The JavaScript of every submission whose JS file can be read, for indexing in one batch."""
+    sources = []
+    for submission_path in submission_paths:
+        try:
+            source = SubmissionContext(submission_path).js_content
+        except (OSError, ValueError):
+            # Unreadable (e.g. not UTF-8); the grader reports it as that student's error
+            continue
+        if source is not None:
+            sources.append(source)
+    return sources
+
+def grade_interactively(grader_factory: Callable[[], Project1Grader], submissions_dir: str, student_dirs: List[str],
+                        journal: ResultsJournal, lookahead: int = 0) -> bool:
+    """Grade students one at a time, pausing for review after each.
+
+    Each result goes to the journal as soon as it is known. Returns False if
+    the grader quit before the end.
+
+    With lookahead, the next students are graded in the background while the
+    current one is reviewed.
+    """
+    submissions = [(student_dir, os.path.join(submissions_dir, student_dir)) for student_dir in student_dirs]
+    graded = grade_in_order(grader_factory, submissions, lookahead)
+    for student_dir, result, output in graded:
+        journal.append(student_dir, result)
+        if output and output.strip():
+            print(output.rstrip())
+        
+        # Print detailed summary for this submission
+        print_submission_summary(student_dir, result)
+        
+        # If there are no errors, try to open the HTML file
+        if "error" not in result:
+            html_file = scan_dir(os.path.join(submissions_dir, student_dir)).find_file("html")
+            if html_file:
+                print("\nOpening HTML file in default browser...")
+                import webbrowser
+                webbrowser.open(f"file://{os.path.abspath(html_file)}")
+        
+        print("\nPress Enter to continue to next submission (or 'q' to quit)...")
+        if input().lower() == 'q':
+            graded.close()
+            return False
+    return True
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Grade student submissions')
     parser.add_argument('--student', type=str, help='Student login to start grading from', default=None)
+    parser.add_argument('--batch', action='store_true', help='Grade every submission without pausing and write grading_results.json')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes to use with --batch')
+    parser.add_argument('--no-cache', action='store_true', help='Regrade every rubric item instead of reusing cached results')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='K', help='Grade the next K students in the background during interactive review')
+    parser.add_argument('--fresh', action='store_true', help="Discard an unfinished run's results journal and grade everyone again")
     args = parser.parse_args()
 
     submissions_dir = "./processed_submissions"  # Directory containing student submissions
-    results = {}
+    # Results are journaled as they come in and compacted into grading_results.json at the end
+    journal = ResultsJournal(journal_path(RESULTS_FILE), fresh=args.fresh)
     
     # Get list of student directories and sort alphabetically
-    student_dirs = sorted([d for d in os.listdir(submissions_dir) 
-                         if os.path.isdir(os.path.join(submissions_dir, d))])
+    student_dirs = list_subdirectories(submissions_dir)
     
     # Find starting index based on provided student login
     start_index = 0
@@ -393,41 +605,45 @@ def main():
     # Reorder the list to start from the selected student
     student_dirs = student_dirs[start_index:] + student_dirs[:start_index]
     
-    grader = Project1Grader()
+    # Pick up where an unfinished run (quit or crashed) left off
+    already_graded = journal.graded_students()
+    if already_graded:
+        print(f"Resuming: {len(already_graded)} students already graded in {journal.path} (use --fresh to start over)")
+        student_dirs = [student_dir for student_dir in student_dirs if student_dir not in already_graded]
     
-    for student_dir in student_dirs:
-        submission_path = os.path.join(submissions_dir, student_dir)
-        result = grader.grade_submission(submission_path)
-        results[student_dir] = result
-        
-        # Print detailed summary for this submission
-        print_submission_summary(student_dir, result)
-        
-        # If there are no errors, try to open the HTML file
-        if "error" not in result:
-            html_file = find_file_by_extension(submission_path, "html")
-            if html_file:
-                print("\nOpening HTML file in default browser...")
-                import webbrowser
-                webbrowser.open(f"file://{os.path.abspath(html_file)}")
-        
-        print("\nPress Enter to continue to next submission (or 'q' to quit)...")
-        if input().lower() == 'q':
-            break
-    
-    # Save results to a JSON file
-    with open("grading_results.json", "w") as f:
-        json.dump(results, f, indent=2)
+    finished = False
+    try:
+        if args.batch:
+            submissions = [(student_dir, os.path.join(submissions_dir, student_dir)) for student_dir in student_dirs]
+            # Parse every student's JavaScript in one node run; the workers then hit the AST cache
+            index_sources(readable_js_sources([path for _, path in submissions]))
+            for student_dir, result, output in grade_in_batch(functools.partial(Project1Grader, use_cache=not args.no_cache), submissions, args.jobs):
+                journal.append(student_dir, result)
+                # Show each student's grader output as one block so workers don't interleave
+                print_submission_summary(student_dir, result)
+                if output.strip():
+                    print("\nGrader output:")
+                    print(output.rstrip())
+            finished = True
+        else:
+            finished = grade_interactively(functools.partial(Project1Grader, use_cache=not args.no_cache), submissions_dir,
+                                           student_dirs, journal, args.prefetch)
+    finally:
+        # Whatever was graded reaches grading_results.json, even after 'q' or a crash
+        journal.compact(RESULTS_FILE)
     
     # Print final summary
     print("\nFinal Grading Summary:")
     print("=" * 60)
-    for student, result in results.items():
+    for student, result in journal.results():
         print(f"\nStudent: {student}")
         if "error" in result:
             print(f"Error: {result['error']}")
         print(f"Total Score: {result['total']['points']}/{result['total']['max_points']}")
         print(f"Percentage: {result['total']['percentage']:.2f}%")
+    
+    # A finished run starts the next one from scratch; an unfinished one is resumed
+    journal.close(remove=finished)
 
 if __name__ == "__main__":
     main()
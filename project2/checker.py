@@ -3,20 +3,34 @@ import re
 import json
 import subprocess
 import tempfile
-import shutil
+import queue
+import atexit
+import threading
 from bs4 import BeautifulSoup
 from typing import Dict, List, Callable, Any, Optional
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 from abc import ABC, abstractmethod
-import glob
 import argparse
 import bisect
+import functools
+import sys
 import webbrowser
 
-def find_file_by_extension(directory: str, extension: str) -> Optional[str]:
-    """Find the first file with the given extension in the directory."""
-    files = glob.glob(os.path.join(directory, f"*.{extension}"))
-    return files[0] if files else None
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.batch import grade_in_batch, grade_in_order
+from common.staging import StagedTemplate
+from common.toolchain import get_toolchain, ToolchainError
+from common.result_cache import ResultCache, hash_file, hash_sources, rubric_item_fingerprint
+from common.journal import ResultsJournal, journal_path
+from common.scan import find_file_by_extension, list_subdirectories
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+NODE_PACKAGES = ("@babel/parser", "mocha")
+RESULT_CACHE_DIR = os.path.join(PROJECT_DIR, ".grading_cache")
+RESULTS_FILE = "grading_results.json"
+TEST_TEMPLATE_PATH = "./test_template.js"
+TEST_WORKER_PATH = os.path.join(PROJECT_DIR, "test_worker.js")
+TEST_TIMEOUT = 10  # seconds
 
 @dataclass
 class GradingResult:
@@ -25,6 +39,9 @@ class GradingResult:
     max_points: float
 
 class RubricItem(ABC):
+    # Bump to invalidate cached results when grading changes outside the item's own class
+    version = 1
+    
     def __init__(self, name: str, max_points: float):
         self.name = name
         self.max_points = max_points
@@ -33,89 +50,201 @@ class RubricItem(ABC):
     def grade(self, submission_path: str) -> GradingResult:
         pass
 
-def run_tests(js_file: str, test_template_path: str) -> Dict[str, Any]:
-    """Run the unit tests and return the results."""
-    # Use a fixed directory for testing
-    temp_dir = 'temp_test'
-    # Clear the directory if it exists, or create it
-    if os.path.exists(temp_dir):
-        shutil.rmtree(temp_dir)
-    os.makedirs(temp_dir, exist_ok=True)
-
-    # Install @babel/parser if not already installed
-    try:
-        subprocess.run(['npm', 'list', '@babel/parser'], check=True, capture_output=True)
-    except subprocess.CalledProcessError:
-        subprocess.run(['npm', 'install', '@babel/parser', '--no-save'], check=True)
-
-    # Create a temporary Node.js script to parse and extract functions
-    parser_script = '''
-    const parser = require('@babel/parser');
-    const fs = require('fs');
-
-    const code = fs.readFileSync(process.argv[2], 'utf-8');
-    const ast = parser.parse(code);
-
-    const functions = {};
-    ast.program.body.forEach(node => {
-        if (node.type === 'FunctionDeclaration' && 
-            ['validateDate', 'validateTime', 'calculatePriority'].includes(node.id.name)) {
-            functions[node.id.name] = code.slice(node.start, node.end);
-        }
-    });
+class TestWorker:
+    """A long-lived node process running test suites over JSON lines.
 
-    // Add module.exports
-    const exportStr = "module.exports = { validateDate, validateTime, calculatePriority };\\n";
-    
-    const output = Object.values(functions).join('\\n\\n') + '\\n\\n' + exportStr;
-    fs.writeFileSync(process.argv[3], output);
-    '''
+    test_worker.js loads @babel/parser and mocha once at startup, so each
+    request only pays for extracting the student's functions and running the
+    suite in a fresh vm context.
+    """
+    def __init__(self):
+        toolchain = get_toolchain(PROJECT_DIR, NODE_PACKAGES)
+        self.process = subprocess.Popen(
+            [toolchain.node, TEST_WORKER_PATH],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            text=True,
+            encoding='utf-8',
+            bufsize=1,
+            env=toolchain.node_env()
+        )
+        self.responses: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.next_id = 0
+        threading.Thread(target=self._read_responses, daemon=True).start()
 
-    # Save the parser script
-    parser_script_path = os.path.join(temp_dir, 'parser.js')
-    with open(parser_script_path, 'w') as f:
-        f.write(parser_script)
+        ready = self._receive(TEST_TIMEOUT)
+        if ready is None or not ready.get('ready'):
+            self.close()
+            reason = ready.get('error') if ready else 'no response'
+            raise RuntimeError(f"Test worker failed to start: {reason}")
 
-    # Extract functions using the parser
-    student_solution_path = os.path.join(temp_dir, 'student_solution.js')
-    try:
-        subprocess.run(['node', parser_script_path, js_file, student_solution_path], check=True)
-    except subprocess.CalledProcessError:
-        return {
-            'success': False,
-            'output': '',
-            'error': 'Failed to parse student code'
+    def _read_responses(self) -> None:
+        for line in self.process.stdout:
+            self.responses.put(line)
+        self.responses.put(None)
+
+    def _receive(self, timeout: float) -> Optional[Dict[str, Any]]:
+        try:
+            line = self.responses.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        return json.loads(line) if line else None
+
+    def alive(self) -> bool:
+        return self.process.poll() is None
+
+    def run(self, js_file: str, test_template_path: str) -> Dict[str, Any]:
+        self.next_id += 1
+        request = {
+            'id': self.next_id,
+            'js_file': os.path.abspath(js_file),
+            'test_template': os.path.abspath(test_template_path)
         }
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+        except OSError as e:
+            self.close()
+            return {'success': False, 'output': '', 'error': str(e), 'tests': [], 'transient': True}
 
-    # Copy the test template
-    test_file_path = os.path.join(temp_dir, 'test.js')
-    shutil.copy2(test_template_path, test_file_path)
+        response = self._receive(TEST_TIMEOUT)
+        if response is None:
+            # Hung or crashed on this submission; the pool replaces dead workers
+            self.close()
+            return {'success': False, 'output': '', 'error': 'Test execution timed out', 'tests': [], 'transient': True}
+        response.pop('id', None)
+        return response
 
-    # Run the tests using Node.js and Mocha
+    def close(self) -> None:
+        if self.alive():
+            self.process.kill()
+        self.process.wait()
+
+class TestWorkerPool:
+    """Hands out test workers, starting new ones lazily up to max_workers."""
+    def __init__(self, max_workers: int = 1):
+        self.max_workers = max_workers
+        self.idle: "queue.LifoQueue[TestWorker]" = queue.LifoQueue()
+        self.started = 0
+        self.lock = threading.Lock()
+        atexit.register(self.close)
+
+    def _acquire(self) -> TestWorker:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            can_start = self.started < self.max_workers
+            if can_start:
+                self.started += 1
+        if not can_start:
+            return self.idle.get()
+        try:
+            return TestWorker()
+        except Exception:
+            with self.lock:
+                self.started -= 1
+            raise
+
+    def _release(self, worker: TestWorker) -> None:
+        if worker.alive():
+            self.idle.put(worker)
+        else:
+            with self.lock:
+                self.started -= 1
+
+    def run(self, js_file: str, test_template_path: str) -> Dict[str, Any]:
+        worker = self._acquire()
+        try:
+            return worker.run(js_file, test_template_path)
+        finally:
+            self._release(worker)
+
+    def close(self) -> None:
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+test_workers = TestWorkerPool()
+
+def run_tests(js_file: str, test_template_path: str) -> Dict[str, Any]:
+    """Run the unit tests and return the results.
+
+    Besides 'success', 'output' and 'error', the result carries 'tests' (one
+    entry per test with its state and duration), 'results' mapping each test's
+    full title ("<suite> <title>") to its entry, and 'suites' mapping each
+    describe() block to its passed/failed counts. 'transient' is set when the
+    run failed for reasons other than the student's code (e.g. a worker that
+    couldn't start or timed out), so its grades shouldn't be cached.
+    """
     try:
-        result = subprocess.run(
-            ['npx', 'mocha', test_file_path],
-            capture_output=True,
-            text=True,
-            timeout=10  # 10 second timeout
-        )
-        return {
-            'success': result.returncode == 0,
-            'output': result.stdout,
-            'error': result.stderr
-        }
-    except subprocess.TimeoutExpired:
-        return {
-            'success': False,
-            'output': '',
-            'error': 'Test execution timed out'
-        }
+        test_results = test_workers.run(js_file, test_template_path)
     except Exception as e:
-        return {
+        test_results = {
             'success': False,
             'output': '',
-            'error': str(e)
+            'error': str(e),
+            'tests': [],
+            'transient': True
         }
+    return index_test_results(test_results)
+
+def index_test_results(test_results: Dict[str, Any]) -> Dict[str, Any]:
+    """Add the per-test and per-suite lookup tables to a test run."""
+    test_results['results'] = {test['fullTitle']: test for test in test_results['tests']}
+    suites: Dict[str, Dict[str, int]] = {}
+    for test in test_results['tests']:
+        counts = suites.setdefault(test['suite'], {'passed': 0, 'failed': 0})
+        if test['state'] in counts:
+            counts[test['state']] += 1
+    test_results['suites'] = suites
+    return test_results
+
+def suite_passed(test_results: Dict[str, Any], suite: str) -> bool:
+    """Return True if every test in the given describe() block ran and passed."""
+    counts = test_results['suites'].get(suite)
+    return counts is not None and counts['failed'] == 0
+
+def test_failed(test_results: Dict[str, Any], suite: str, title: str) -> bool:
+    """Return True if the named test ran and failed."""
+    test = test_results['results'].get(f"{suite} {title}")
+    return test is not None and test['state'] == 'failed'
+
+class TestRunCache:
+    """Memoize run_tests() results so the suite runs once per submission.
+
+    Results are keyed by the content hash of the student's JS file, the test
+    template and test_worker.js, so every rubric item grading the same
+    submission reads the same run instead of launching mocha again. With a
+    store, runs are also kept on disk, so later runs (e.g. after fixing one
+    rubric item) don't test the class again.
+    """
+    def __init__(self, store: Optional[ResultCache] = None):
+        self.store = store
+        self._results: Dict[str, Dict[str, Any]] = {}
+
+    def get(self, js_file: str, test_template_path: str = TEST_TEMPLATE_PATH) -> Dict[str, Any]:
+        key = ResultCache.key("test-run", hash_file(js_file), hash_file(test_template_path), hash_file(TEST_WORKER_PATH))
+        if key in self._results:
+            return self._results[key]
+        stored = self.store.get(key) if self.store else None
+        if stored is not None:
+            test_results = index_test_results(stored)
+        else:
+            test_results = run_tests(js_file, test_template_path)
+            # Let a transient failure be retried by the next caller
+            if test_results.get('transient'):
+                return test_results
+            if self.store:
+                self.store.put(key, {name: value for name, value in test_results.items()
+                                     if name not in ('results', 'suites')})
+        self._results[key] = test_results
+        return test_results
+
+test_run_cache = TestRunCache()
 
 class ValidateDateGrader(RubricItem):
     def __init__(self):
@@ -126,37 +255,36 @@ class ValidateDateGrader(RubricItem):
         if not js_file:
             return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
         
-        test_results = run_tests(js_file, "./test_template.js")
+        test_results = test_run_cache.get(js_file, TEST_TEMPLATE_PATH)
         print(test_results['output'])
         
-        if not test_results['success']:
-            # Parse test output to identify which specific tests failed
-            output = test_results['output']
+        if not suite_passed(test_results, "validateDate"):
+            # Look up which specific tests failed
             points = 6.0
             comments = []
             
             # Check for specific test failures and deduct points accordingly
-            if "should accept valid dates" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should accept valid dates"):
                 points -= 1
                 comments.append("Failed to validate correct date formats")
             
-            if "should reject strings without exactly one forward slash" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should reject strings without exactly one forward slash"):
                 points -= 1
                 comments.append("Failed to properly check for single forward slash")
             
-            if "should reject parts that are not exactly 2 digits" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should reject parts that are not exactly 2 digits"):
                 points -= 1
                 comments.append("Failed to verify exactly 2 digits in each part")
             
-            if "should reject non-numeric characters" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should reject non-numeric characters"):
                 points -= 1
                 comments.append("Failed to validate numeric characters")
             
-            if "should reject invalid months" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should reject invalid months"):
                 points -= 1
                 comments.append("Failed to properly validate month range")
             
-            if "should reject invalid days for each month" in output and "failing" in output:
+            if test_failed(test_results, "validateDate", "should reject invalid days for each month"):
                 points -= 1
                 comments.append("Failed to properly validate days for specific months")
             
@@ -177,36 +305,35 @@ class ValidateTimeGrader(RubricItem):
         if not js_file:
             return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
         
-        test_results = run_tests(js_file, "./test_template.js")
+        test_results = test_run_cache.get(js_file, TEST_TEMPLATE_PATH)
         
-        if not test_results['success']:
-            # Parse test output to identify which specific tests failed
-            output = test_results['output']
+        if not suite_passed(test_results, "validateTime"):
+            # Look up which specific tests failed
             points = 6.0
             comments = []
             
             # Check for specific test failures and deduct points accordingly
-            if "should accept valid times" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should accept valid times"):
                 points -= 1
                 comments.append("Failed to validate correct time formats")
             
-            if "should reject strings without exactly one colon" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should reject strings without exactly one colon"):
                 points -= 1
                 comments.append("Failed to properly check for single colon")
             
-            if "should reject parts that are not exactly 2 digits" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should reject parts that are not exactly 2 digits"):
                 points -= 1
                 comments.append("Failed to verify exactly 2 digits in each part")
             
-            if "should reject non-numeric characters" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should reject non-numeric characters"):
                 points -= 1
                 comments.append("Failed to validate numeric characters")
             
-            if "should reject invalid hours" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should reject invalid hours"):
                 points -= 1
                 comments.append("Failed to properly validate hours range (0-23)")
             
-            if "should reject invalid minutes" in output and "failing" in output:
+            if test_failed(test_results, "validateTime", "should reject invalid minutes"):
                 points -= 1
                 comments.append("Failed to properly validate minutes range (0-59)")
             
@@ -227,27 +354,22 @@ class CalculatePriorityGrader(RubricItem):
         if not js_file:
             return GradingResult(0, ["No JavaScript file found in submission"], self.max_points)
         
-        test_results = run_tests(js_file, "./test_template.js")
+        test_results = test_run_cache.get(js_file, TEST_TEMPLATE_PATH)
         
-        if not test_results['success']:
-            # Parse test output to identify which specific tests failed
-            output = test_results['output']
+        if not suite_passed(test_results, "calculatePriority"):
+            # Look up which specific tests failed
             points = 8.0
             comments = []
             
             # Check for specific test failures and deduct points accordingly
-            if "should correctly calculate priority for valid inputs" in output and "failing" in output:
+            if test_failed(test_results, "calculatePriority", "should correctly calculate timestamp for valid inputs"):
                 points -= 3
                 comments.append("Failed to calculate correct priorities for various scenarios")
             
-            if "should handle edge cases correctly" in output and "failing" in output:
+            if test_failed(test_results, "calculatePriority", "should handle edge cases correctly"):
                 points -= 3
                 comments.append("Failed to handle edge cases properly")
             
-            if "should return 0 for invalid inputs" in output and "failing" in output:
-                points -= 2
-                comments.append("Failed to handle invalid inputs properly")
-            
             if not comments:
                 comments.append("Unknown test failures")
                 points = max(1, points - 4)
@@ -257,7 +379,13 @@ class CalculatePriorityGrader(RubricItem):
         return GradingResult(8.0, ["All calculatePriority tests passed successfully"], self.max_points)
 
 class Project2Grader:
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        self.result_cache = ResultCache(RESULT_CACHE_DIR, enabled=use_cache)
+        # The shared helpers every item relies on: the test result lookups and the test worker
+        self.engine = ResultCache.key(hash_sources(index_test_results, suite_passed, test_failed),
+                                      hash_file(TEST_WORKER_PATH))
+        # Test runs are kept with the item results, so changing one item doesn't rerun the tests
+        test_run_cache.store = self.result_cache
         self.rubric_items = [
             ValidateDateGrader(),
             ValidateTimeGrader(),
@@ -282,22 +410,36 @@ class Project2Grader:
                 }
             }
         
-        # Check if Node.js and Mocha are available
-        try:
-            subprocess.run(['node', '--version'], capture_output=True, check=True)
-            subprocess.run(['npx', 'mocha', '--version'], capture_output=True, check=True)
-        except subprocess.CalledProcessError:
-            return {
-                "error": "Node.js and/or Mocha are not installed. Please install them to run the tests.",
-                "total": {
-                    "points": 0,
-                    "max_points": sum(item.max_points for item in self.rubric_items),
-                    "percentage": 0
+        # Reuse results for items whose code, the student's JS and the tests are all unchanged
+        inputs = (hash_file(js_file), hash_file(TEST_TEMPLATE_PATH))
+        keys = {item.name: self.result_cache.key(*inputs, rubric_item_fingerprint(item, self.engine)) for item in self.rubric_items}
+        cached = {name: self.result_cache.get(key) for name, key in keys.items()}
+        
+        test_results = None
+        if any(result is None for result in cached.values()):
+            # Check that Node.js and Mocha are available; this is only probed once per process
+            try:
+                get_toolchain(PROJECT_DIR, NODE_PACKAGES)
+            except ToolchainError as e:
+                return {
+                    "error": f"Node.js and/or Mocha are not installed. Please install them to run the tests. ({str(e)})",
+                    "total": {
+                        "points": 0,
+                        "max_points": sum(item.max_points for item in self.rubric_items),
+                        "percentage": 0
+                    }
                 }
-            }
+            
+            # Run the test suite once up front; every rubric item reads this run
+            test_results = test_run_cache.get(js_file, TEST_TEMPLATE_PATH)
         
         for item in self.rubric_items:
-            result = item.grade(submission_path)
+            if cached[item.name] is not None:
+                result = GradingResult(**cached[item.name])
+            else:
+                result = item.grade(submission_path)
+                if not test_results.get('transient'):
+                    self.result_cache.put(keys[item.name], asdict(result))
             results[item.name] = {
                 "points": result.points,
                 "max_points": result.max_points,
@@ -340,18 +482,68 @@ def print_submission_summary(student: str, result: Dict[str, Any]) -> None:
     print("\nTotal Results:")
     print(f"Total Score: {result['total']['points']}/{result['total']['max_points']}")
 
+def grade_interactively(grader_factory: Callable[[], Project2Grader], submissions_dir: str, student_dirs: List[str],
+                        journal: ResultsJournal, lookahead: int = 0) -> bool:
+    """Grade students one at a time, pausing for review after each.
+
+    Each result goes to the journal as soon as it is known. Returns False if
+    the grader quit before the end.
+
+    With lookahead, the next students are graded (and their tests run) in the
+    background while the current one is reviewed.
+    """
+    submissions = [(student_dir, os.path.join(submissions_dir, student_dir)) for student_dir in student_dirs]
+    graded = grade_in_order(grader_factory, submissions, lookahead)
+    # The HTML and CSS from website_template are staged once; each student gets a linked view
+    web_template = StagedTemplate("./website_template", ["tasklist-modified.html", "tasklist-modified.css"], label="web")
+    try:
+        for student_dir, result, output in graded:
+            submission_path = os.path.join(submissions_dir, student_dir)
+            journal.append(student_dir, result)
+            if output and output.strip():
+                print(output.rstrip())
+            
+            # Print detailed summary for this submission
+            print_submission_summary(student_dir, result)
+            
+            # If there are no errors, try to open the JavaScript file
+            web_view = None
+            if "error" not in result:
+                js_file = find_file_by_extension(submission_path, "js")
+                if js_file:
+                    # Link in the student's JS under the name the page expects
+                    web_view = web_template.view({"tasklist-modified.js": js_file}, label="web")
+                    # Open the HTML file in the default browser
+                    webbrowser.open(f"file://{os.path.abspath(os.path.join(web_view.path, 'tasklist-modified.html'))}")
+            
+            print("\nPress Enter to continue to next submission (or 'q' to quit)...")
+            answer = input().lower()
+            if web_view:
+                web_view.cleanup()
+            if answer == 'q':
+                graded.close()
+                return False
+    finally:
+        web_template.cleanup()
+    return True
+
 def main():
     # Set up argument parser
     parser = argparse.ArgumentParser(description='Grade student submissions')
     parser.add_argument('--student', type=str, help='Student login to start grading from', default=None)
+    parser.add_argument('--batch', action='store_true', help='Grade every submission without pausing and write grading_results.json')
+    parser.add_argument('--jobs', type=int, default=os.cpu_count() or 1, help='Number of worker processes to use with --batch')
+    parser.add_argument('--no-cache', action='store_true', help='Regrade every rubric item instead of reusing cached results')
+    parser.add_argument('--prefetch', type=int, default=0, metavar='K', help='Grade the next K students in the background during interactive review')
+    parser.add_argument('--fresh', action='store_true', help="Discard an unfinished run's results journal and grade everyone again")
     args = parser.parse_args()
 
     submissions_dir = "./processed_submissions"  # Directory containing student submissions
-    results = {}
+    # Results are journaled as they come in and compacted into grading_results.json at the end
+    journal = ResultsJournal(journal_path(RESULTS_FILE), fresh=args.fresh)
     
     # Get list of student directories and sort alphabetically
-    student_dirs = sorted([d for d in os.listdir(submissions_dir) 
-                         if os.path.isdir(os.path.join(submissions_dir, d))])
+    student_dirs = list_subdirectories(submissions_dir)
     
     # Find starting index based on provided student login
     start_index = 0
@@ -368,51 +560,43 @@ def main():
     # Reorder the list to start from the selected student
     student_dirs = student_dirs[start_index:] + student_dirs[:start_index]
     
-    grader = Project2Grader()
-    
-    for student_dir in student_dirs:
-        submission_path = os.path.join(submissions_dir, student_dir)
-        result = grader.grade_submission(submission_path)
-        results[student_dir] = result
-        
-        # Print detailed summary for this submission
-        print_submission_summary(student_dir, result)
-        
-        # If there are no errors, try to open the JavaScript file
-        if "error" not in result:
-            js_file = find_file_by_extension(submission_path, "js")
-            if js_file:
-                # Use a constant temp_run directory
-                temp_web_dir = './temp_run'
-                # Clear the directory if it exists, or create it
-                if os.path.exists(temp_web_dir):
-                    shutil.rmtree(temp_web_dir)
-                os.makedirs(temp_web_dir, exist_ok=True)
-                # Copy HTML and CSS from website_template
-                shutil.copy2("./website_template/tasklist-modified.html", os.path.join(temp_web_dir, "tasklist-modified.html"))
-                shutil.copy2("./website_template/tasklist-modified.css", os.path.join(temp_web_dir, "tasklist-modified.css"))
-                # Copy and rename student's JS file
-                shutil.copy2(js_file, os.path.join(temp_web_dir, "tasklist-modified.js"))
-                # Open the HTML file in the default browser
-                webbrowser.open(f"file://{os.path.abspath(os.path.join(temp_web_dir, 'tasklist-modified.html'))}")
-        
-        print("\nPress Enter to continue to next submission (or 'q' to quit)...")
-        if input().lower() == 'q':
-            break
+    # Pick up where an unfinished run (quit or crashed) left off
+    already_graded = journal.graded_students()
+    if already_graded:
+        print(f"Resuming: {len(already_graded)} students already graded in {journal.path} (use --fresh to start over)")
+        student_dirs = [student_dir for student_dir in student_dirs if student_dir not in already_graded]
     
-    # Save results to a JSON file
-    with open("grading_results.json", "w") as f:
-        json.dump(results, f, indent=2)
+    finished = False
+    try:
+        if args.batch:
+            submissions = [(student_dir, os.path.join(submissions_dir, student_dir)) for student_dir in student_dirs]
+            for student_dir, result, output in grade_in_batch(functools.partial(Project2Grader, use_cache=not args.no_cache), submissions, args.jobs):
+                journal.append(student_dir, result)
+                # Show each student's grader output as one block so workers don't interleave
+                print_submission_summary(student_dir, result)
+                if output.strip():
+                    print("\nGrader output:")
+                    print(output.rstrip())
+            finished = True
+        else:
+            finished = grade_interactively(functools.partial(Project2Grader, use_cache=not args.no_cache), submissions_dir,
+                                           student_dirs, journal, args.prefetch)
+    finally:
+        # Whatever was graded reaches grading_results.json, even after 'q' or a crash
+        journal.compact(RESULTS_FILE)
     
     # Print final summary
     print("\nFinal Grading Summary:")
     print("=" * 60)
-    for student, result in results.items():
+    for student, result in journal.results():
         print(f"\nStudent: {student}")
         if "error" in result:
             print(f"Error: {result['error']}")
         print(f"Total Score: {result['total']['points']}/{result['total']['max_points']}")
         print(f"Percentage: {result['total']['percentage']:.2f}%")
+    
+    # A finished run starts the next one from scratch; an unfinished one is resumed
+    journal.close(remove=finished)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,186 @@
+// Long-lived test runner for project 2.
+//
+// Loads @babel/parser and mocha once, then reads JSON requests from stdin, one
+// per line: {"id": 1, "js_file": "...", "test_template": "..."}. For each
+// request it extracts the graded functions from the student's file, runs the
+// test template against them in a fresh vm context and writes one JSON line
+// with the results back to stdout.
+const fs = require('fs');
+const vm = require('vm');
+const readline = require('readline');
+
+let parser;
+let Mocha;
+try {
+    parser = require('@babel/parser');
+    Mocha = require('mocha');
+} catch (e) {
+    process.stdout.write(JSON.stringify({ ready: false, error: e.message }) + '\n');
+    process.exit(1);
+}
+
+const GRADED_FUNCTIONS = ['validateDate', 'validateTime', 'calculatePriority'];
+const STUDENT_MODULE = './student_solution.js';
+
+// Thrown in place of process.exit() so a test template can't kill the worker
+class SuiteAborted extends Error {}
+
+function extractFunctions(code) {
+    const ast = parser.parse(code);
+
+    const functions = {};
+    ast.program.body.forEach(node => {
+        if (node.type === 'FunctionDeclaration' &&
+            GRADED_FUNCTIONS.includes(node.id.name)) {
+            functions[node.id.name] = code.slice(node.start, node.end);
+        }
+    });
+
+    const exportStr = `module.exports = { ${GRADED_FUNCTIONS.join(', ')} };\n`;
+    return Object.values(functions).join('\n\n') + '\n\n' + exportStr;
+}
+
+function makeConsole(lines) {
+    const write = (...args) => lines.push(args.map(String).join(' '));
+    return { log: write, info: write, warn: write, error: write, debug: write };
+}
+
+function makeContext(studentSource, logLines) {
+    const context = {
+        console: makeConsole(logLines),
+        setTimeout, clearTimeout, setInterval, clearInterval, setImmediate, clearImmediate,
+        process: {
+            env: {},
+            exit: code => { throw new SuiteAborted(`process.exit(${code}) called`); }
+        }
+    };
+    vm.createContext(context);
+    // Go through the context's global proxy so reads of global.Date etc. see the builtins
+    context.global = vm.runInContext('globalThis', context);
+
+    let studentModule = null;
+    context.require = name => {
+        if (name !== STUDENT_MODULE) {
+            return require(name);
+        }
+        if (studentModule === null) {
+            const module = { exports: {} };
+            const wrapped = vm.runInContext(
+                `(function (module, exports) {\n${studentSource}\n})`,
+                context, { filename: 'student_solution.js' });
+            wrapped(module, module.exports);
+            studentModule = module;
+        }
+        return studentModule.exports;
+    };
+    return context;
+}
+
+function CollectingReporter(runner, options) {
+    const reporterOptions = options.reporterOption || options.reporterOptions;
+    const tests = reporterOptions.tests;
+    const record = (test, state, err) => {
+        tests.push({
+            suite: test.parent ? test.parent.fullTitle() : '',
+            title: test.title,
+            fullTitle: test.fullTitle(),
+            state: state,
+            duration: test.duration || 0,
+            error: err ? String(err.message || err) : null
+        });
+    };
+    runner.on('pass', test => record(test, 'passed'));
+    runner.on('fail', (test, err) => {
+        // Hook failures are reported against the hook, not a test
+        if (test.type === 'test') {
+            record(test, 'failed', err);
+        }
+    });
+    runner.on('pending', test => record(test, 'pending'));
+}
+
+// Render the results the way mocha's spec reporter would
+function formatOutput(tests) {
+    const lines = [];
+    let suite = null;
+    const failures = tests.filter(test => test.state === 'failed');
+    tests.forEach(test => {
+        if (test.suite !== suite) {
+            suite = test.suite;
+            lines.push('', `  ${suite}`);
+        }
+        if (test.state === 'failed') {
+            lines.push(`    ${failures.indexOf(test) + 1}) ${test.title}`);
+        } else if (test.state === 'pending') {
+            lines.push(`    - ${test.title}`);
+        } else {
+            lines.push(`    ✓ ${test.title}`);
+        }
+    });
+    const passing = tests.filter(test => test.state === 'passed').length;
+    lines.push('', '', `  ${passing} passing`);
+    if (failures.length) {
+        lines.push(`  ${failures.length} failing`, '');
+        failures.forEach((test, i) => {
+            lines.push(`  ${i + 1}) ${test.suite}`, `       ${test.title}:`, `     ${test.error}`, '');
+        });
+    }
+    return lines.join('\n') + '\n';
+}
+
+function runSuite(request) {
+    const logLines = [];
+    let studentSource;
+    try {
+        studentSource = extractFunctions(fs.readFileSync(request.js_file, 'utf-8'));
+    } catch (e) {
+        return Promise.resolve({ success: false, output: '', error: 'Failed to parse student code', tests: [] });
+    }
+
+    const tests = [];
+    const mocha = new Mocha({ reporter: CollectingReporter, reporterOptions: { tests }, timeout: 2000 });
+    const context = makeContext(studentSource, logLines);
+    mocha.suite.emit('pre-require', context, request.test_template, mocha);
+    try {
+        vm.runInContext(fs.readFileSync(request.test_template, 'utf-8'), context,
+            { filename: request.test_template, timeout: 5000 });
+    } catch (e) {
+        if (!(e instanceof SuiteAborted)) {
+            logLines.push(String(e && e.message || e));
+        }
+        return Promise.resolve({ success: false, output: '', error: logLines.join('\n'), tests: [] });
+    }
+
+    return new Promise(resolve => {
+        mocha.run(failures => {
+            resolve({
+                success: failures === 0,
+                output: formatOutput(tests),
+                error: logLines.join('\n'),
+                tests: tests
+            });
+        });
+    });
+}
+
+// Requests are handled strictly one at a time, in arrival order
+let queue = Promise.resolve();
+readline.createInterface({ input: process.stdin }).on('line', line => {
+    if (!line.trim()) {
+        return;
+    }
+    queue = queue.then(async () => {
+        let request;
+        let response;
+        try {
+            request = JSON.parse(line);
+            response = await runSuite(request);
+        } catch (e) {
+            response = { success: false, output: '', error: String(e && e.message || e), tests: [] };
+        }
+        response.id = request ? request.id : null;
+        process.stdout.write(JSON.stringify(response) + '\n');
+    });
+});
+
+process.stdout.write(JSON.stringify({ ready: true }) + '\n');